@@ -0,0 +1,67 @@
+# Benchmark: cost of the password KDF per work factor, and admin login latency under a burst.
+#
+#   python benchmarks/bench_auth.py [--attempts 20] [--threads 8]
+#
+# Part 1 times one scrypt hash for a range of N (r and p from config) with its
+# memory use, to choose AUTH_SCRYPT_N for the machine the app runs on. Part 2
+# fires --attempts concurrent logins (half correct, half wrong) at the configured
+# parameters and reports p50/p95/max latency and how many were rate-limited.
+# Runs against a throwaway SQLite file.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.environ['ALLIANCES_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='alliances_bench_'), 'bench.sqlite3')
+
+import numpy as np
+from config import AUTH_SCRYPT_N, AUTH_SCRYPT_R, AUTH_SCRYPT_P, AUTH_MAX_CONCURRENT_HASHES
+from auth import auth_utils
+from db.bootstrap import ensure_database
+
+
+def bench_work_factors(repeat: int = 3):
+    print(f"scrypt, r={AUTH_SCRYPT_R}, p={AUTH_SCRYPT_P}:")
+    for exponent in range(12, 18):
+        n = 2 ** exponent
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            auth_utils._scrypt('correct horse battery staple', os.urandom(16), n, AUTH_SCRYPT_R, AUTH_SCRYPT_P)
+            times.append(time.perf_counter() - start)
+        memory = 128 * n * AUTH_SCRYPT_R * AUTH_SCRYPT_P / 2 ** 20
+        marker = '  <- configured' if n == AUTH_SCRYPT_N else ''
+        print(f"  N=2**{exponent:<3} {np.median(times) * 1000:8.1f} ms  {memory:6.0f} MiB{marker}")
+
+
+def bench_burst(attempts: int, threads: int):
+    ensure_database()
+    def attempt(i):
+        start = time.perf_counter()
+        success, msg = auth_utils.login_admin('admin', 'adminpass' if i % 2 == 0 else 'wrong password')
+        return time.perf_counter() - start, success, msg
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(attempt, range(attempts)))
+    latencies = np.array([elapsed for elapsed, _, _ in results]) * 1000
+    limited = sum(1 for _, _, msg in results if msg.startswith("Too many"))
+    print(f"\n{attempts} concurrent logins on {threads} threads, {AUTH_MAX_CONCURRENT_HASHES} hash slots:")
+    print(f"  p50 {np.percentile(latencies, 50):.1f} ms  p95 {np.percentile(latencies, 95):.1f} ms  "
+          f"max {latencies.max():.1f} ms  rate-limited {limited}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password KDF cost and login latency under a burst.')
+    parser.add_argument('--attempts', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    bench_work_factors()
+    bench_burst(args.attempts, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Per-rerun cost of the dashboard tabs: lazy rendering vs running every tab.
+#
+#   python benchmarks/bench_lazy_tabs.py [rows] [reruns]
+#
+# Opens each admin and guest view in turn, times warm reruns with that view
+# active, and compares them with what an eager st.tabs rerun would add: the last
+# measured render time of every other view (ui.navigation.estimate_rerun_savings).
+# Runs against a throwaway SQLite file.
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.environ['ALLIANCES_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='alliances_tabs_'), 'tabs.sqlite3')
+
+from streamlit.testing.v1 import AppTest
+from db import database_operations as dbo
+from db.bootstrap import ensure_database
+from ui.navigation import get_view_timings, estimate_rerun_savings
+from stress_concurrent_reads import make_performance
+
+
+def bench_role(role: str, key: str, reruns: int):
+    at = AppTest.from_file(os.path.join(ROOT, 'src', 'app.py'), default_timeout=300)
+    at.session_state['logged_in'] = True
+    at.session_state['role'] = role
+    at.session_state['username'] = role
+    at.run()
+    labels = at.radio(key=key).options
+    # Visit every view once so each has a measured render time
+    for label in labels:
+        at.radio(key=key).set_value(label).run()
+    print(f"{role}:")
+    for label in labels:
+        at.radio(key=key).set_value(label).run()
+        start = time.perf_counter()
+        for _ in range(reruns):
+            at.run()
+        lazy = (time.perf_counter() - start) / reruns
+        saved = estimate_rerun_savings(key, label)
+        print(f"  {label:<22} lazy {lazy * 1000:8.1f}ms   eager ~{(lazy + saved) * 1000:8.1f}ms   saved {saved * 1000:8.1f}ms/rerun")
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    timings = get_view_timings(key)
+    print("  view render (last): " + ", ".join(f"{label} {t['last'] * 1000:.1f}ms" for label, t in timings.items()))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    reruns = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    ensure_database()
+    ok, msg = dbo.replace_workbook_data({'performance_data': make_performance(rows, 1)})
+    assert ok, msg
+    print(f"rows: {rows}, reruns per view: {reruns}")
+    bench_role('admin', 'admin_view', reruns)
+    bench_role('guest', 'guest_view', reruns)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Startup benchmark: cold and warm runs of app.py, plus the per-rerun bootstrap cost.
+#
+#   python benchmarks/bench_startup.py [warm_runs]
+#
+# "cold" is the first script run in a fresh interpreter (module imports, schema
+# creation on an empty database); "warm" are the Streamlit reruns that follow.
+# Each cold sample runs in its own subprocess. Runs against a throwaway SQLite file.
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'src', 'app.py')
+
+
+def run_app(warm_runs: int):
+    # Executed in a subprocess: prints the cold run time then each warm rerun time
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=120)
+    times = []
+    for _ in range(warm_runs + 1):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    print(' '.join(f'{t:.6f}' for t in times))
+
+
+def bootstrap_costs(repeat: int = 20):
+    # Per-rerun cost of the old unconditional DDL vs the guarded bootstrap
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    from db.database_operations import create_all_sqlite_tables, ensure_default_admin
+    from db.bootstrap import ensure_database
+    ensure_database()
+
+    def median(fn):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return sorted(times)[repeat // 2]
+
+    unguarded = median(lambda: (create_all_sqlite_tables(), ensure_default_admin()))
+    guarded = median(ensure_database)
+    print(f"{unguarded:.6f} {guarded:.6f}")
+
+
+def sample(mode: str, db_path: str, *args) -> list:
+    env = dict(os.environ, ALLIANCES_DB_PATH=db_path)
+    out = subprocess.run([sys.executable, __file__, mode, *args], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    # Timings are the last line; anything before it is log output from the app
+    return [float(v) for v in out.strip().splitlines()[-1].split()]
+
+
+def main():
+    warm_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    tmp = tempfile.mkdtemp(prefix='alliances_startup_')
+    fresh = sample('--app', os.path.join(tmp, 'fresh.sqlite3'), str(warm_runs))
+    existing = sample('--app', os.path.join(tmp, 'fresh.sqlite3'), str(warm_runs))
+    unguarded, guarded = sample('--bootstrap', os.path.join(tmp, 'fresh.sqlite3'))
+    warm = sorted(fresh[1:] + existing[1:])
+    print(f"cold run, new database      : {fresh[0] * 1000:8.1f}ms")
+    print(f"cold run, existing database : {existing[0] * 1000:8.1f}ms")
+    print(f"warm rerun (median)         : {warm[len(warm) // 2] * 1000:8.1f}ms")
+    print(f"bootstrap per rerun         : {unguarded * 1e6:8.1f}us unguarded DDL, {guarded * 1e6:.1f}us guarded")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--app':
+        run_app(int(sys.argv[2]))
+    elif len(sys.argv) > 1 and sys.argv[1] == '--bootstrap':
+        bootstrap_costs()
+    else:
+        main()
@@ -0,0 +1,263 @@
+# Reproducible end-to-end benchmark suite on synthetic partner-performance workbooks.
+#
+#   python benchmarks/bench_suite.py [--sizes 10000,100000,1000000] [--repeat 3]
+#                                    [--out results.json] [--compare baseline.json]
+#
+# For each size a workbook in the real sheet layout ('Associate ID', 'Associate
+# Name', 'Activity Code', 'Activity Name', 'Alliance Type', 'BU', 'Geo',
+# 'Completion Date', 'Feedback') is generated from a fixed seed, cached under
+# --data-dir, and pushed through the same steps as the app, headlessly:
+#
+#   parse        parse_workbook (the in-memory upload path, as run by the import job)
+#   stream       iter_performance_chunks + replace_performance_data_chunked (large uploads)
+#   load         replace_workbook_data, replacing and syncing (Load button)
+#   snapshot     get_all_performance_data, cold (after a write) and warm
+#                columnar snapshot write, and restore from it (db/columnar_snapshot.py)
+#   filter       filter index build, get_filtered_performance_data, summary, rollup
+#   charts       each admin chart builder on the full rollup, plus its JSON size
+#
+# Every step is run --repeat times; min/median/max seconds are written to --out
+# as JSON together with the environment. With --compare, medians are compared
+# against an earlier results file and the script exits with status 1 if any step
+# got slower than --threshold times its baseline. Runs against a throwaway
+# SQLite file.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+_WORK_DIR = tempfile.mkdtemp(prefix='alliances_suite_')
+os.environ['ALLIANCES_DB_PATH'] = os.path.join(_WORK_DIR, 'suite.sqlite3')
+os.environ['ALLIANCES_SNAPSHOT_DIR'] = os.path.join(_WORK_DIR, 'snapshots')
+
+import numpy as np
+import pandas as pd
+from db import database_operations as dbo
+from db.bootstrap import ensure_database
+from db.connection_pool import close_pool
+from db.columnar_snapshot import write_performance_snapshot, restore_performance_snapshot
+from utils.excel_parser import parse_workbook, iter_performance_chunks
+
+SHEET_HEADERS = ('Associate ID', 'Associate Name', 'Activity Code', 'Activity Name', 'Alliance Type',
+                 'BU', 'Geo', 'Completion Date', 'Feedback')
+ALLIANCES = ('AWS', 'Microsoft', 'Google', 'Salesforce', 'ServiceNow', 'SAP')
+BUSINESS_UNITS = ('BFSI', 'Retail', 'Health', 'Energy', 'Manufacturing', 'Communications')
+GEOS = ('India', 'NA', 'GGM')
+# Filter states exercised on the filter path: none, one column, all columns, dates
+FILTER_CASES = (
+    {},
+    {'alliance_type': 'AWS'},
+    {'alliance_type': 'Google', 'business_unit': 'Retail', 'geo': 'NA'},
+    {'geo': 'India', 'date_range': [datetime.date(2024, 6, 1), datetime.date(2024, 12, 31)]},
+)
+
+
+def generate_workbook(rows: int, path: str, seed: int = 7):
+    """Write a performance sheet with ``rows`` data rows to ``path``."""
+    import xlsxwriter
+    rng = np.random.default_rng(seed)
+    associates = rng.integers(100000, 100000 + max(rows // 4, 10), rows)
+    activities = rng.integers(1, 400, rows)
+    alliances = rng.integers(0, len(ALLIANCES), rows)
+    units = rng.integers(0, len(BUSINESS_UNITS), rows)
+    geos = rng.integers(0, len(GEOS), rows)
+    days = rng.integers(0, 730, rows)
+    start = datetime.date(2024, 1, 1)
+    # constant_memory streams rows to disk, so 1M rows do not sit in memory
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Performance')
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    worksheet.write_row(0, 0, SHEET_HEADERS)
+    for i in range(rows):
+        r = i + 1
+        alliance = ALLIANCES[alliances[i]]
+        worksheet.write_number(r, 0, int(associates[i]))
+        worksheet.write_string(r, 1, f'Associate {associates[i]}')
+        worksheet.write_string(r, 2, f'{alliance[:3].upper()}-{activities[i]:03d}')
+        worksheet.write_string(r, 3, f'{alliance} Certification {activities[i]}')
+        worksheet.write_string(r, 4, alliance)
+        worksheet.write_string(r, 5, BUSINESS_UNITS[units[i]])
+        worksheet.write_string(r, 6, GEOS[geos[i]])
+        day = start + datetime.timedelta(days=int(days[i]))
+        # Exports mix real date cells with dates typed as text
+        if i % 10:
+            worksheet.write_datetime(r, 7, datetime.datetime.combine(day, datetime.time()), date_format)
+        else:
+            worksheet.write_string(r, 7, day.strftime('%d %b %Y'))
+        if i % 50 == 0:
+            worksheet.write_string(r, 8, 'Completed ahead of schedule')
+    workbook.close()
+
+
+def workbook_path(rows: int, data_dir: str, seed: int) -> str:
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'performance_{rows}_{seed}.xlsx')
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        generate_workbook(rows, path + '.tmp', seed)
+        os.replace(path + '.tmp', path)
+        print(f"  generated {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def measure(repeat: int, step, setup=None) -> dict:
+    """Run ``step`` ``repeat`` times (``setup`` before each, untimed); seconds min/median/max."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        step()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': float(np.median(times)), 'max': max(times), 'runs': repeat}
+
+
+def expect(result):
+    ok, msg = result
+    if not ok:
+        raise SystemExit(msg)
+
+
+def bench_size(rows: int, path: str, repeat: int) -> dict:
+    from ui.admin_dashboard import plot_cert_by_alliance, plot_cert_by_bu, plot_cert_by_geo, plot_monthly_trend
+    results = {}
+
+    def run(name, step, setup=None, times=repeat):
+        results[name] = measure(times, step, setup)
+        print(f"  {name:<32} {results[name]['median'] * 1000:10.1f} ms")
+
+    # Uploads arrive as bytes and go through the same steps as utils.import_runner._run_import
+    with open(path, 'rb') as f:
+        data = f.read()
+    parsed = {}
+    def parse():
+        parsed['frames'], _, errors = parse_workbook(data)
+        if errors:
+            raise SystemExit("\n".join(errors))
+    run('parse.parse_workbook', parse)
+    frames = parsed['frames']
+    results['rows_loaded'] = len(frames['performance_data'])
+
+    run('stream.replace_chunked', lambda: expect(dbo.replace_performance_data_chunked(iter_performance_chunks(path))))
+    run('load.replace', lambda: expect(dbo.replace_workbook_data(frames)))
+    run('load.sync_unchanged', lambda: expect(dbo.replace_workbook_data(frames, performance_mode='sync')))
+    # The UI marks the data changed after every load; a cold read follows
+    run('snapshot.get_all.cold', dbo.get_all_performance_data, setup=dbo.mark_performance_data_changed)
+    run('snapshot.get_all.warm', dbo.get_all_performance_data)
+
+    def reload_snapshot():
+        dbo.mark_performance_data_changed()
+        dbo.get_all_performance_data()
+
+    def reload_index():
+        reload_snapshot()
+        dbo.get_performance_filter_index()
+
+    run('filter.index_build', dbo.get_performance_filter_index, setup=reload_snapshot)
+    for i, filters in enumerate(FILTER_CASES):
+        # Each step starts from a warm snapshot and index, with its own cache cold
+        run(f'filter.select.{i}', lambda: dbo.get_filtered_performance_data(filters),
+            setup=dbo.get_performance_filter_index)
+        run(f'filter.summary.{i}', lambda: dbo.get_performance_summary(filters), setup=reload_index)
+        run(f'filter.rollup.{i}', lambda: dbo.get_performance_rollup(filters),
+            setup=dbo.mark_performance_data_changed)
+
+    # Fast restore path: write the columnar snapshot, rebuild the table from it
+    run('snapshot.write', write_performance_snapshot)
+    run('snapshot.restore', lambda: expect(restore_performance_snapshot()))
+
+    rollup = dbo.get_performance_rollup()
+    for name, build in (('cert_by_alliance', plot_cert_by_alliance), ('cert_by_bu', plot_cert_by_bu),
+                        ('cert_by_geo', plot_cert_by_geo), ('monthly_trend', plot_monthly_trend)):
+        run(f'chart.{name}.build', lambda: build(rollup))
+        figure = build(rollup)
+        # Streamlit serializes the figure on every st.plotly_chart call
+        run(f'chart.{name}.to_json', figure.to_json)
+        results[f'chart.{name}.json_bytes'] = len(figure.to_json())
+    return results
+
+
+def environment(seed: int) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit, 'seed': seed,
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'pandas': pd.__version__, 'numpy': np.__version__, 'sqlite': sqlite3.sqlite_version,
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print median ratios against ``baseline``; return the steps slower than ``threshold``x."""
+    regressions = []
+    print(f"\nAgainst baseline {baseline['environment'].get('commit')} ({baseline['environment'].get('date')}):")
+    for size, steps in results['sizes'].items():
+        base_steps = baseline['sizes'].get(size)
+        if not base_steps:
+            continue
+        for name, timing in steps.items():
+            base = base_steps.get(name)
+            if not isinstance(timing, dict) or not isinstance(base, dict) or not base['median']:
+                continue
+            ratio = timing['median'] / base['median']
+            flag = ' REGRESSION' if ratio > threshold else ''
+            print(f"  {size:>8} {name:<32} {base['median'] * 1000:10.1f} -> {timing['median'] * 1000:10.1f} ms  x{ratio:.2f}{flag}")
+            if flag:
+                regressions.append((size, name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite on synthetic performance workbooks.')
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='comma-separated row counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'alliances_bench_data'),
+                        help='where generated workbooks are cached')
+    parser.add_argument('--out', default=os.path.join(ROOT, 'benchmarks', 'results.json'))
+    parser.add_argument('--compare', help='earlier results file to compare medians against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    ensure_database()
+    results = {'environment': environment(args.seed), 'repeat': args.repeat, 'sizes': {}}
+    for rows in (int(size) for size in args.sizes.split(',')):
+        print(f"{rows} rows:")
+        path = workbook_path(rows, args.data_dir, args.seed)
+        results['sizes'][str(rows)] = bench_size(rows, path, args.repeat)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+def teardown():
+    # Pooled connections hold the throwaway database open; close them before deleting it
+    close_pool()
+    shutil.rmtree(_WORK_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        teardown()
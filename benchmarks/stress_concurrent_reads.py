@@ -0,0 +1,119 @@
+# Load numbers for many reader threads against one bulk writer.
+#
+#   python benchmarks/stress_concurrent_reads.py [readers] [rows] [loads]
+#
+# A writer thread repeatedly replaces performance_data (alternating between two
+# sizes) while reader threads query it; reports read throughput, latency
+# percentiles and pool usage. That reads stay correct and never fail meanwhile is
+# checked by tests/test_concurrent_reads.py. Runs against a throwaway SQLite file.
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+_WORK_DIR = tempfile.mkdtemp(prefix='alliances_stress_')
+os.environ['ALLIANCES_DB_PATH'] = os.path.join(_WORK_DIR, 'stress.sqlite3')
+
+import numpy as np
+import pandas as pd
+from db import database_operations as dbo
+from db.connection_pool import pooled_connection, get_pool_stats, close_pool
+
+
+def make_performance(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 540, rows), unit='D')
+    return pd.DataFrame({
+        'associate_id': rng.integers(1000, 9000, rows).astype(str),
+        'associate_name': [f'Associate {i}' for i in range(rows)],
+        'activity_code': rng.choice(['AWS-01', 'AZ-204', 'GCP-ACE', 'SF-ADM'], rows),
+        'alliance_type': rng.choice(['AWS', 'Microsoft', 'Google', 'Salesforce'], rows),
+        'business_unit': rng.choice(['BFSI', 'Retail', 'Health', 'Energy'], rows),
+        'geo': rng.choice(['India', 'NA', 'GGM'], rows),
+        'certification_name': 'Certification',
+        'completion_date': dates.strftime('%Y-%m-%d'),
+        'feedback': None,
+    })
+
+
+def read_snapshot():
+    # Both counts come from one read transaction, i.e. one WAL snapshot
+    with pooled_connection() as conn:
+        conn.execute("BEGIN")
+        rows = conn.execute("SELECT COUNT(*) FROM performance_data").fetchone()[0]
+        rolled_up = conn.execute("SELECT COALESCE(SUM(certifications), 0) FROM performance_rollup").fetchone()[0]
+        conn.rollback()
+    return rows, rolled_up
+
+
+def main():
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    loads = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    dbo.create_all_sqlite_tables()
+    frames = [make_performance(rows, 1), make_performance(rows // 2, 2)]
+    ok, msg = dbo.replace_workbook_data({'performance_data': frames[0]})
+    assert ok, msg
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    failures, latencies = [], []
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                read_snapshot()
+                dbo.get_all_performance_data()
+            except Exception as e:
+                with lock:
+                    failures.append(repr(e))
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    def writer():
+        for i in range(loads):
+            ok, msg = dbo.replace_workbook_data({'performance_data': frames[(i + 1) % 2]})
+            if not ok:
+                with lock:
+                    failures.append(f"writer: {msg}")
+        stop.set()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    writer_thread.join()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    lat = np.array(latencies) * 1000
+    stats = get_pool_stats()
+    print(f"readers: {readers}, rows per load: {rows}, loads: {loads}, elapsed: {elapsed:.2f}s")
+    print(f"reads        : {len(lat)} ({len(lat) / elapsed:,.0f}/sec)")
+    print(f"read latency : p50 {np.percentile(lat, 50):.1f}ms  p95 {np.percentile(lat, 95):.1f}ms  max {lat.max():.1f}ms")
+    print(f"pool         : {stats['open']} open, {stats['waits']} waits, {stats['writes']} writes")
+    print(f"errors       : {len(failures)}")
+    for failure in failures[:10]:
+        print(f"  {failure}")
+
+
+def teardown():
+    # Pooled connections hold the throwaway database open; close them before deleting it
+    close_pool()
+    shutil.rmtree(_WORK_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        teardown()
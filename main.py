@@ -1,9 +1,48 @@
+import argparse
 import os
 import sys
 import subprocess
 
 
+def restore_snapshot(path: str = None) -> int:
+    # Rebuild performance_data from the columnar snapshot of the last load
+    # (src/db/columnar_snapshot.py) without parsing any workbook. A running app
+    # notices the restore through the stored data version and drops its caches;
+    # the report pack is rebuilt here, as after a restore from the app
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+    from db.bootstrap import ensure_database
+    from db.columnar_snapshot import restore_performance_snapshot
+    from utils.report_pack import build_report_pack as build
+    ensure_database()
+    success, msg = restore_performance_snapshot(path)
+    print(msg)
+    if success:
+        print(build("restore")[1])
+    return 0 if success else 1
+
+
+def build_report_pack() -> int:
+    # Render the standard report pack (src/utils/report_pack.py) headlessly, e.g. from cron
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+    from db.bootstrap import ensure_database
+    from utils.report_pack import build_report_pack as build
+    ensure_database()
+    success, msg = build("schedule")
+    print(msg)
+    return 0 if success else 1
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Global Alliances dashboard.")
+    parser.add_argument("--restore-snapshot", nargs="?", const="", metavar="PATH",
+                        help="rebuild performance data from the last load's snapshot (or PATH) and exit")
+    parser.add_argument("--build-report-pack", action="store_true",
+                        help="render the BU Wise, Alliance Wise and Cost Savings report pack to disk and exit")
+    args = parser.parse_args()
+    if args.restore_snapshot is not None:
+        sys.exit(restore_snapshot(args.restore_snapshot or None))
+    if args.build_report_pack:
+        sys.exit(build_report_pack())
     # Launch the Streamlit app
     app_path = os.path.join(os.path.dirname(__file__), "src", "app.py")
     subprocess.run([sys.executable, "-m", "streamlit", "run", app_path])
@@ -4,13 +4,14 @@ import logging
 from ui.login import login_page
 from ui.admin_dashboard import admin_dashboard
 from ui.guest_dashboard import guest_dashboard
-from db.database_operations import create_all_sqlite_tables, ensure_default_admin
+from db.bootstrap import ensure_database
+from utils.instrumentation import begin_rerun, end_rerun
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 
-# Ensure tables and default admin exist before any authentication
-create_all_sqlite_tables()
-ensure_default_admin()
+# Ensure tables and default admin exist before any authentication; this only does
+# work on the first run in a process, later reruns return immediately
+ensure_database()
 
 st.title("Global Strategic Alliances Partner Performance Dashboard")
 
@@ -19,10 +20,16 @@ if 'logged_in' not in st.session_state:
     st.session_state['role'] = None
     st.session_state['username'] = None
 
-if not st.session_state['logged_in']:
-    login_page()
-else:
-    if st.session_state['role'] == 'admin':
-        admin_dashboard()
-    elif st.session_state['role'] == 'guest':
-        guest_dashboard()
+# Profile each rerun for the admin Performance panel and the metrics log. The
+# finally also covers reruns cut short by st.rerun()
+begin_rerun(role=st.session_state['role'])
+try:
+    if not st.session_state['logged_in']:
+        login_page()
+    else:
+        if st.session_state['role'] == 'admin':
+            admin_dashboard()
+        elif st.session_state['role'] == 'guest':
+            guest_dashboard()
+finally:
+    st.session_state['last_rerun_profile'] = end_rerun()
@@ -1,30 +1,154 @@
 # Authentication utilities
+#
+# Passwords are stored as 'scrypt$<N>$<r>$<p>$<salt>$<hash>' (base64 salt and
+# hash): a random 16-byte salt per password and scrypt, which is memory-hard, so
+# every guess costs AUTH_SCRYPT_N-dependent time and memory. Hashes from before
+# (unsalted SHA-256 hex) or with outdated parameters still verify, and are
+# rehashed on the next successful login. Login attempts are rate-limited by
+# in-memory token buckets, per username and overall, and at most
+# AUTH_MAX_CONCURRENT_HASHES hashes run at once, so a burst of attempts queues
+# instead of exhausting memory.
+
+import base64
 import hashlib
-import sqlite3
-from config import SQLITE_DB_PATH
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import (AUTH_SCRYPT_N, AUTH_SCRYPT_R, AUTH_SCRYPT_P, AUTH_MAX_CONCURRENT_HASHES, AUTH_USER_ATTEMPTS,
+                    AUTH_USER_REFILL_SECONDS, AUTH_GLOBAL_ATTEMPTS_PER_SECOND, AUTH_GLOBAL_BURST)
+from db.connection_pool import pooled_connection
+from utils.instrumentation import timed, incr
+
+SCRYPT_PREFIX = 'scrypt'
+SALT_BYTES = 16
+HASH_BYTES = 32
+# Usernames with a rate-limit bucket kept in memory; the least recently used go first
+_MAX_TRACKED_USERS = 1024
+
+INVALID_CREDENTIALS = "Invalid username or password"
+
+_hash_slots = threading.BoundedSemaphore(AUTH_MAX_CONCURRENT_HASHES)
+
+class TokenBucket:
+    """``capacity`` tokens, refilled at ``rate`` per second; take() spends one if available."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def refill(self):
+        self.tokens = self.capacity
+
+_buckets_lock = threading.Lock()
+_user_buckets = OrderedDict()  # username -> TokenBucket
+_global_bucket = TokenBucket(AUTH_GLOBAL_BURST, AUTH_GLOBAL_ATTEMPTS_PER_SECOND)
 
+def _allow_attempt(username: str) -> bool:
+    with _buckets_lock:
+        bucket = _user_buckets.get(username)
+        if bucket is None:
+            bucket = _user_buckets[username] = TokenBucket(AUTH_USER_ATTEMPTS, 1 / AUTH_USER_REFILL_SECONDS)
+            if len(_user_buckets) > _MAX_TRACKED_USERS:
+                _user_buckets.popitem(last=False)
+        _user_buckets.move_to_end(username)
+        # The per-user bucket goes first, so one user's lockout does not drain the global one
+        return bucket.take() and _global_bucket.take()
+
+def _reset_attempts(username: str):
+    with _buckets_lock:
+        if username in _user_buckets:
+            _user_buckets[username].refill()
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    with _hash_slots:
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=2 * 128 * n * r * p, dklen=HASH_BYTES)
+
+@timed('auth.hash_password')
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, AUTH_SCRYPT_N, AUTH_SCRYPT_R, AUTH_SCRYPT_P)
+    return '$'.join((SCRYPT_PREFIX, str(AUTH_SCRYPT_N), str(AUTH_SCRYPT_R), str(AUTH_SCRYPT_P),
+                     base64.b64encode(salt).decode('ascii'), base64.b64encode(digest).decode('ascii')))
 
+def _parse_scrypt(hashed: str):
+    # (n, r, p, salt, digest), or None if ``hashed`` is not in the scrypt format
+    parts = hashed.split('$')
+    if len(parts) != 6 or parts[0] != SCRYPT_PREFIX:
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3]), base64.b64decode(parts[4]), base64.b64decode(parts[5])
+    except ValueError:
+        return None
+
+@timed('auth.verify_password')
 def verify_password(password: str, hashed: str) -> bool:
-    return hash_password(password) == hashed
+    params = _parse_scrypt(hashed or '')
+    if params is None:
+        # Legacy unsalted SHA-256 hex digest
+        legacy = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        return hmac.compare_digest(legacy, hashed or '')
+    n, r, p, salt, digest = params
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p), digest)
+
+def needs_rehash(hashed: str) -> bool:
+    """True for legacy hashes and scrypt hashes with other than the configured parameters."""
+    params = _parse_scrypt(hashed or '')
+    return params is None or params[:3] != (AUTH_SCRYPT_N, AUTH_SCRYPT_R, AUTH_SCRYPT_P)
+
+# Verified against when the username does not exist, so unknown and known users
+# take the same time to reject
+_dummy_hash = None
+
+def _get_dummy_hash() -> str:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(base64.b64encode(os.urandom(SALT_BYTES)).decode('ascii'))
+    return _dummy_hash
+
+@timed('auth.login')
+def login_admin(username: str, password: str) -> (bool, str):
+    """Check admin credentials under the rate limits. Returns (success, message)."""
+    from db.database_operations import update_admin_password
+    if not _allow_attempt(username):
+        incr('auth.rate_limited')
+        return False, "Too many login attempts. Please wait a minute and try again."
+    with pooled_connection() as conn:
+        row = conn.execute("SELECT password FROM users WHERE username=? AND role='admin'", (username,)).fetchone()
+    if row is None or not verify_password(password, row[0]):
+        if row is None:
+            verify_password(password, _get_dummy_hash())
+        incr('auth.failures')
+        return False, INVALID_CREDENTIALS
+    _reset_attempts(username)
+    if needs_rehash(row[0]):
+        # Transparent upgrade of legacy or outdated hashes; the password is only known now
+        if update_admin_password(username, hash_password(password)):
+            incr('auth.rehashed')
+    return True, "Login successful"
 
 def authenticate_admin(username: str, password: str) -> bool:
-    conn = sqlite3.connect(SQLITE_DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT password FROM users WHERE username=? AND role='admin'", (username,))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    if row:
-        return verify_password(password, row[0])
-    return False
+    return login_admin(username, password)[0]
 
 def change_admin_password(username: str, current_password: str, new_password: str) -> (bool, str):
     """Change admin password if current password is correct. Returns (success, message)."""
     from db.database_operations import update_admin_password
-    if not authenticate_admin(username, current_password):
-        return False, "Current password is incorrect."
+    success, msg = login_admin(username, current_password)
+    if not success:
+        return False, "Current password is incorrect." if msg == INVALID_CREDENTIALS else msg
     new_hashed = hash_password(new_password)
     success = update_admin_password(username, new_hashed)
     if success:
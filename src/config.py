@@ -10,4 +10,85 @@ DB_CONFIG = {
 
 # SQLite3 configuration
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-SQLITE_DB_PATH = os.path.join(BASE_DIR, 'global_alliances_db.sqlite3')
+# ALLIANCES_DB_PATH points the app (or a benchmark) at a different database file
+SQLITE_DB_PATH = os.environ.get('ALLIANCES_DB_PATH', os.path.join(BASE_DIR, 'global_alliances_db.sqlite3'))
+# Content-addressed store of uploaded workbooks (utils/backup_store.py), and its
+# retention: at most BACKUP_KEEP_LATEST backups, none older than
+# BACKUP_MAX_AGE_DAYS except the most recent one
+BACKUP_DIR = os.environ.get('ALLIANCES_BACKUP_DIR', os.path.join(BASE_DIR, 'uploaded_backups'))
+BACKUP_KEEP_LATEST = 20
+BACKUP_MAX_AGE_DAYS = 90
+# Columnar (Arrow/Feather) snapshot of performance_data written after every load
+# (db/columnar_snapshot.py), for restores that skip parsing Excel
+SNAPSHOT_DIR = os.environ.get('ALLIANCES_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+# Background import job state (db/import_jobs.py) lives in its own small database,
+# so progress can be written while a load holds the main database's write lock
+IMPORT_JOBS_DB_PATH = os.environ.get('ALLIANCES_JOBS_DB_PATH', os.path.splitext(SQLITE_DB_PATH)[0] + '_jobs.sqlite3')
+
+# Password hashing (auth/auth_utils.py): scrypt cost factor N (a power of two), block
+# size r and parallelism p. Each hash takes 128 * N * r bytes of memory; N = 2**15,
+# r = 8 is 32 MiB and about 135 ms on one core. Measure with benchmarks/bench_auth.py
+# before changing; stored hashes with other parameters are upgraded at login
+AUTH_SCRYPT_N = 2 ** 15
+AUTH_SCRYPT_R = 8
+AUTH_SCRYPT_P = 1
+# Hashes computed at once; further logins queue, which bounds memory and CPU in a burst
+AUTH_MAX_CONCURRENT_HASHES = 2
+# Login rate limits (token buckets): attempts per username in a burst and seconds to
+# regain one, and attempts per second across all usernames with its burst
+AUTH_USER_ATTEMPTS = 5
+AUTH_USER_REFILL_SECONDS = 12
+AUTH_GLOBAL_ATTEMPTS_PER_SECOND = 5
+AUTH_GLOBAL_BURST = 10
+
+# Connection pool (db/connection_pool.py): most connections open at once, and
+# seconds a thread waits for one when all are checked out
+SQLITE_POOL_SIZE = 8
+SQLITE_POOL_TIMEOUT = 30
+# Seconds SQLite retries a locked database (e.g. another process writing) before
+# failing, and seconds a write waits in the in-process writer queue
+SQLITE_BUSY_TIMEOUT = 30
+SQLITE_WRITER_TIMEOUT = 120
+
+# Excel uploads larger than this are streamed through openpyxl's read-only mode
+# and loaded in chunks instead of being read into memory whole
+STREAMING_UPLOAD_THRESHOLD_BYTES = 20 * 1024 * 1024
+# Streaming loads stop reading after this many invalid rows
+STREAMING_MAX_ERRORS = 100
+
+# Seconds between checks of the performance data version stored in the database,
+# through which the app notices writes made by other processes (e.g. a
+# --restore-snapshot run from the command line)
+DATA_VERSION_CHECK_SECONDS = 2
+
+# Rows per page of the Data Management grid; each page is fetched from SQLite
+GRID_PAGE_SIZE = 100
+
+# Memory cap for the process-wide Plotly figure cache (utils/figure_cache.py),
+# measured as the figures' serialized JSON size
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Downloadable exports (utils/export_cache.py): where generated files are kept, rows
+# fetched from SQLite per chunk, and most files kept before the oldest are deleted
+EXPORT_DIR = os.environ.get('ALLIANCES_EXPORT_DIR', os.path.join(BASE_DIR, 'exports'))
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_CACHE_MAX_FILES = 16
+
+# Pre-rendered report pack (utils/report_pack.py): where packs are written, and how
+# many recent packs are kept
+REPORT_PACK_DIR = os.environ.get('ALLIANCES_REPORT_PACK_DIR', os.path.join(BASE_DIR, 'report_packs'))
+REPORT_PACK_KEEP = 3
+
+# Instrumentation (utils/instrumentation.py): recent samples kept per timer for the
+# percentiles, and seconds between process-wide metric summaries in the log
+METRICS_SAMPLES_PER_TIMER = 1000
+METRICS_SUMMARY_INTERVAL = 300
+
+# Background imports (utils/import_runner.py): worker threads, and seconds between
+# progress polls in the Data Management tab while a job is running
+IMPORT_WORKERS = 2
+IMPORT_POLL_SECONDS = 2
+
+# Worker processes that parse the sheets of a multi-sheet workbook concurrently
+# (utils/excel_parser.py parse_workbook)
+WORKBOOK_PARSE_PROCESSES = min(5, os.cpu_count() or 1)
@@ -63,8 +63,9 @@ def ensure_default_admin():
         import logging
         logging.info('Default admin user ensured.')
 
-# Confirm database connection at import/startup
-if __name__ == "__main__" or True:
+# Connection test: python src/database_operations.py. Nothing runs at import time;
+# the app creates its schema through db.bootstrap.ensure_database().
+if __name__ == "__main__":
     import logging
     try:
         conn = get_sqlite_connection()
@@ -78,7 +79,3 @@ if __name__ == "__main__" or True:
     except Exception as e:
         logging.error(f'Database connection test: ERROR - {e}')
         print(f'Database connection test: ERROR - {e}')
-
-# Ensure tables exist at import/startup
-create_all_sqlite_tables()
-ensure_default_admin()
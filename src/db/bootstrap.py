@@ -0,0 +1,60 @@
+# One-time database bootstrap: schema creation, migrations and the default admin
+#
+# Streamlit re-executes app.py on every interaction, so the bootstrap runs once per
+# process and is a flag check afterwards. The applied schema version is stored in
+# the database file itself (PRAGMA user_version); a database that is already at
+# SCHEMA_VERSION skips the DDL entirely, even in a fresh process.
+
+import logging
+import threading
+from db.connection_pool import pooled_connection, writer_connection
+from db.database_operations import create_all_sqlite_tables, create_data_version_table, ensure_default_admin
+from utils.backup_store import create_backup_catalog
+
+# (version, step) pairs applied in order to databases below that version. Each
+# step commits its own work and must be idempotent: a database created before
+# versioning starts at 0 whatever it already contains.
+MIGRATIONS = (
+    (1, create_all_sqlite_tables),
+    (2, create_backup_catalog),
+    (3, create_data_version_table),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
+def get_schema_version() -> int:
+    """Schema version recorded in the database file (0 for an unversioned database)."""
+    with pooled_connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def ensure_database(force: bool = False):
+    """Bring the database up to SCHEMA_VERSION and ensure the default admin, once per process.
+
+    ``force`` re-runs the checks, e.g. after the database file was replaced.
+    """
+    global _bootstrapped
+    if _bootstrapped and not force:
+        return
+    with _bootstrap_lock:
+        if _bootstrapped and not force:
+            return
+        version = get_schema_version()
+        if version > SCHEMA_VERSION:
+            logging.warning(f'Database schema version {version} is newer than this app\'s ({SCHEMA_VERSION}).')
+        elif version < SCHEMA_VERSION:
+            # Holding the writer slot keeps other threads' writes out while migrating;
+            # the version is read again under it in case another process migrated first
+            with writer_connection() as conn:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                for target, step in MIGRATIONS:
+                    if version < target:
+                        step()
+                        # user_version cannot be bound as a parameter
+                        conn.execute(f"PRAGMA user_version = {int(target)}")
+                        conn.commit()
+                        version = target
+                        logging.info(f'Database schema migrated to version {target}.')
+        ensure_default_admin()
+        _bootstrapped = True
@@ -0,0 +1,87 @@
+# Columnar snapshot of performance_data for fast restores and warm starts
+#
+# After every successful load the typed in-memory frame (categoricals, datetime
+# completion dates; see get_all_performance_data) is written to SNAPSHOT_DIR as an
+# uncompressed Arrow IPC (Feather v2) file. Reading it back is a memory-mapped
+# read with no Excel parsing or date inference, so rebuilding the database from
+# the last load, or priming the shared snapshot, takes a fraction of an import.
+# Only the latest load is kept; it is replaced atomically.
+
+import datetime
+import json
+import logging
+import os
+import uuid
+from config import SNAPSHOT_DIR
+from utils.instrumentation import timed
+
+SNAPSHOT_FILE = 'performance_data.arrow'
+# Schema metadata key holding the snapshot's description (rows, source, time)
+SNAPSHOT_METADATA_KEY = b'alliances_snapshot'
+
+def snapshot_path() -> str:
+    return os.path.join(SNAPSHOT_DIR, SNAPSHOT_FILE)
+
+@timed('snapshot.write')
+def write_performance_snapshot(**details) -> str:
+    """Write the current performance_data to the snapshot file; returns its path, or None on error.
+
+    ``details`` (e.g. the source file name and backup hash) are stored with it.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    from db.database_operations import get_all_performance_data, PERFORMANCE_STORED_COLUMNS
+    try:
+        df = get_all_performance_data()
+        if df is None:
+            return None
+        # Stored columns in table order, without the derived helper columns
+        columns = [col for col in df.columns if col in PERFORMANCE_STORED_COLUMNS]
+        table = pa.Table.from_pandas(df[columns], preserve_index=False)
+        details.update(rows=len(df), written_at=datetime.datetime.now().isoformat(timespec='seconds'))
+        table = table.replace_schema_metadata({**table.schema.metadata, SNAPSHOT_METADATA_KEY: json.dumps(details)})
+        path = snapshot_path()
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        temp = path + f'.{uuid.uuid4().hex}.tmp'
+        # Uncompressed, so the file can be memory-mapped instead of decoded
+        feather.write_feather(table, temp, compression='uncompressed')
+        os.replace(temp, path)
+        return path
+    except Exception as e:
+        logging.error(f'Error writing performance snapshot: {e}')
+        return None
+
+def get_snapshot_info(path: str = None) -> dict:
+    """Details stored with a snapshot (rows, written_at, ...), or None if there is none."""
+    import pyarrow as pa
+    path = path or snapshot_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        return json.loads(metadata.get(SNAPSHOT_METADATA_KEY, b'{}'))
+    except Exception as e:
+        logging.error(f'Error reading performance snapshot {path}: {e}')
+        return None
+
+@timed('snapshot.read')
+def read_performance_snapshot(path: str = None):
+    """The snapshot as a typed frame (PERFORMANCE_STORED_COLUMNS), or None if there is none."""
+    import pyarrow.feather as feather
+    path = path or snapshot_path()
+    if not os.path.exists(path):
+        return None
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+def restore_performance_snapshot(path: str = None) -> tuple[bool, str]:
+    """Rebuild performance_data from the snapshot and prime the shared snapshot with it."""
+    from db.database_operations import restore_performance_data
+    try:
+        df = read_performance_snapshot(path)
+    except Exception as e:
+        logging.error(f'Error reading performance snapshot: {e}')
+        return False, str(e)
+    if df is None:
+        return False, "No performance snapshot has been written yet."
+    return restore_performance_data(df)
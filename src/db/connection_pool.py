@@ -0,0 +1,173 @@
+# Pooled SQLite connections shared by the database helpers
+#
+# Streamlit runs every script rerun on a fresh thread, so thread-local
+# connections alone would be opened and dropped on each rerun. Instead a small
+# process-wide pool hands out connections: a thread holds at most one at a time
+# (nested helper calls reuse it), and returns it to the pool when done.
+#
+# The database runs in WAL mode, so readers keep seeing the last committed
+# snapshot while a write is in progress. Writers go through writer_connection(),
+# which queues them on a process-wide lock so only one write transaction runs at
+# a time instead of writers failing with "database is locked".
+
+import collections
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import SQLITE_DB_PATH, SQLITE_POOL_SIZE, SQLITE_POOL_TIMEOUT, SQLITE_BUSY_TIMEOUT, SQLITE_WRITER_TIMEOUT
+
+# Applied once when a connection is opened rather than on every checkout
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_cond = threading.Condition()
+_idle = []  # used as a stack so the most recently returned connections stay warm
+_waiting = collections.deque()  # FIFO tickets; waiters are served before newcomers
+_local = threading.local()
+_open_count = 0
+_writer_lock = threading.RLock()
+_stats = {'opens': 0, 'reuses': 0, 'nested': 0, 'waits': 0, 'wait_time': 0.0, 'writes': 0, 'writer_wait_time': 0.0}
+
+def _open_connection():
+    # timeout is SQLite's busy handler: retry instead of failing immediately when
+    # another process holds the write lock
+    conn = sqlite3.connect(SQLITE_DB_PATH, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _take_locked():
+    # Caller holds _cond. Returns an idle connection, None to open a new one,
+    # or False if the pool is exhausted.
+    global _open_count
+    if _idle:
+        _stats['reuses'] += 1
+        return _idle.pop()
+    if _open_count < SQLITE_POOL_SIZE:
+        _open_count += 1
+        return None
+    return False
+
+def _acquire():
+    global _open_count
+    with _cond:
+        conn = _take_locked() if not _waiting else False
+        if conn is False:
+            # Pool exhausted: queue up behind earlier waiters
+            ticket = object()
+            _waiting.append(ticket)
+            start = time.perf_counter()
+            deadline = start + SQLITE_POOL_TIMEOUT
+            try:
+                while True:
+                    if _waiting[0] is ticket:
+                        conn = _take_locked()
+                        if conn is not False:
+                            break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError("Timed out waiting for a database connection.")
+                    _cond.wait(remaining)
+            finally:
+                _waiting.remove(ticket)
+                _cond.notify_all()
+            _stats['waits'] += 1
+            _stats['wait_time'] += time.perf_counter() - start
+    if conn is None:
+        try:
+            conn = _open_connection()
+        except Exception:
+            with _cond:
+                _open_count -= 1
+                _cond.notify_all()
+            raise
+        with _cond:
+            _stats['opens'] += 1
+    return conn
+
+def _release(conn):
+    with _cond:
+        _idle.append(conn)
+        _cond.notify_all()
+
+@contextmanager
+def pooled_connection():
+    """Check out a pooled connection for the current thread.
+
+    Re-entrant: a helper called while its caller already holds a connection gets
+    the same one. Any transaction left open (e.g. by an exception) is rolled back
+    before the connection goes back to the pool.
+    """
+    held = getattr(_local, 'conn', None)
+    if held is not None:
+        with _cond:
+            _stats['nested'] += 1
+        yield held
+        return
+    conn = _acquire()
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            _release(conn)
+        except sqlite3.Error:
+            # Unusable connection; drop it so a fresh one can be opened
+            _discard(conn)
+
+@contextmanager
+def writer_connection():
+    """Check out a pooled connection for writing, inside BEGIN IMMEDIATE.
+
+    Writers queue on a process-wide lock, so one write transaction runs at a time
+    while readers carry on against the last committed snapshot. The caller
+    commits; anything left uncommitted is rolled back when the block exits.
+    """
+    start = time.perf_counter()
+    if not _writer_lock.acquire(timeout=SQLITE_WRITER_TIMEOUT):
+        raise sqlite3.OperationalError("Timed out waiting for another write to finish.")
+    try:
+        with _cond:
+            _stats['writes'] += 1
+            _stats['writer_wait_time'] += time.perf_counter() - start
+        with pooled_connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+    finally:
+        _writer_lock.release()
+
+def _discard(conn):
+    global _open_count
+    with _cond:
+        _open_count -= 1
+        _cond.notify_all()
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+def get_pool_stats() -> dict:
+    """Counters for the admin/benchmark views: opens, reuses, waits, writes and wait times."""
+    with _cond:
+        stats = dict(_stats)
+        stats['open'] = _open_count
+        stats['idle'] = len(_idle)
+        stats['waiting'] = len(_waiting)
+    stats['in_use'] = stats['open'] - stats['idle']
+    return stats
+
+def close_pool():
+    """Close every idle connection, e.g. before the database file is replaced."""
+    with _cond:
+        idle = list(_idle)
+        _idle.clear()
+    for conn in idle:
+        _discard(conn)
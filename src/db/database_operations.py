@@ -1,7 +1,67 @@
 # Database CRUD and business logic for all tables
 
 import sqlite3
-from config import SQLITE_DB_PATH
+import threading
+import time
+from contextlib import contextmanager
+from config import SQLITE_DB_PATH, STREAMING_MAX_ERRORS, DATA_VERSION_CHECK_SECONDS
+from db.connection_pool import pooled_connection, writer_connection
+from utils.instrumentation import timed, incr
+
+# Process-wide snapshot of performance_data shared by every session and report.
+# Writers bump the data version via mark_performance_data_changed(); readers only
+# go back to SQLite when their cached snapshot was taken at an older version.
+_data_version = 0
+_perf_cache = {'version': None, 'df': None}
+_rollup_cache = {'version': None, 'df': None}
+_filter_index_cache = {'version': None, 'index': None}
+_count_cache = {}
+_COUNT_CACHE_SIZE = 8
+_summary_cache = {}  # filter_state_key -> (version, filters, PerformanceSummary)
+_SUMMARY_CACHE_SIZE = 8
+# Writes that other processes must see (restores, which can run from the command
+# line) also bump a counter in the data_versions table. Readers compare it with
+# the value last seen, at most every DATA_VERSION_CHECK_SECONDS, and bump the
+# process-local version when it moved.
+_stored_version = {'seen': None, 'checked': 0.0}
+
+# performance_data columns written by bulk loads, in INSERT order
+PERFORMANCE_INSERT_COLUMNS = (
+    'associate_id', 'associate_name', 'activity_code', 'alliance_type', 'business_unit',
+    'geo', 'certification_name', 'completion_date', 'feedback'
+)
+
+# Every stored performance_data column, as kept in columnar snapshots (db/columnar_snapshot.py)
+PERFORMANCE_STORED_COLUMNS = ('id',) + PERFORMANCE_INSERT_COLUMNS + ('created_at',)
+
+# Natural key used to match uploaded rows against stored ones
+NATURAL_KEY_COLUMNS = ('associate_id', 'activity_code', 'completion_date')
+
+# Sidebar filter keys that map 1:1 onto performance_data columns
+FILTER_COLUMNS = ('alliance_type', 'business_unit', 'geo')
+
+# Columns shown (and sortable) in the Data Management grid, and those its search box matches
+GRID_COLUMNS = (
+    'associate_id', 'associate_name', 'activity_code', 'certification_name',
+    'completion_date', 'alliance_type', 'business_unit', 'geo'
+)
+GRID_SEARCH_COLUMNS = ('associate_id', 'associate_name', 'activity_code', 'certification_name')
+
+# Report tables overwritten from their workbook sheets: table -> (label, columns
+# written, columns that must be present)
+METRICS_TABLES = {
+    'global_metrics': ('Global metrics', ('metric_name', 'value', 'geo'), ('metric_name', 'value')),
+    'bu_metrics': ('BU metrics', ('business_unit', 'target', 'completed', 'achievement_percent'), ('business_unit', 'target', 'completed')),
+    'alliance_metrics': ('Alliance metrics', ('partner_name', 'business_unit', 'target', 'completed'), ('partner_name',)),
+    'cost_savings': ('Cost savings', ('partner_name', 'enablement_saving', 'certification_saving', 'total'), ('partner_name',)),
+}
+
+# Repetitive text columns held as pandas categoricals in the in-memory frames
+PERFORMANCE_CATEGORY_COLUMNS = (
+    'associate_id', 'associate_name', 'activity_code', 'alliance_type',
+    'business_unit', 'geo', 'certification_name', 'created_at'
+)
+_perf_cache_lock = threading.RLock()
 
 def get_sqlite_connection():
     import logging
@@ -13,8 +73,7 @@ def get_sqlite_connection():
         return None
 
 def create_all_sqlite_tables():
-    conn = get_sqlite_connection()
-    if conn:
+    with writer_connection() as conn:
         cursor = conn.cursor()
         # Users table
         cursor.execute('''CREATE TABLE IF NOT EXISTS users (
@@ -72,16 +131,35 @@ def create_all_sqlite_tables():
             total REAL,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         )''')
+        # Composite indexes so every prefix of the sidebar filters
+        # (alliance -> BU -> geo -> date range) is served by an index seek
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_perf_alliance_bu_geo_date ON performance_data (alliance_type, business_unit, geo, completion_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_perf_bu_geo_date ON performance_data (business_unit, geo, completion_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_perf_geo_date ON performance_data (geo, completion_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_perf_date ON performance_data (completion_date)")
+        # Materialized certification counts per (month, alliance, BU, geo); the
+        # dashboard charts read these instead of grouping raw rows on every render
+        cursor.execute('''CREATE TABLE IF NOT EXISTS performance_rollup (
+            month TEXT NOT NULL,
+            alliance_type TEXT NOT NULL,
+            business_unit TEXT NOT NULL,
+            geo TEXT NOT NULL,
+            certifications INTEGER NOT NULL,
+            PRIMARY KEY (month, alliance_type, business_unit, geo)
+        )''')
+        # Backfill the rollup for databases created before it existed
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM performance_rollup), EXISTS(SELECT 1 FROM performance_data)")
+        rollup_populated, has_data = cursor.fetchone()
+        if has_data and not rollup_populated:
+            _rebuild_rollup(cursor)
         conn.commit()
         cursor.close()
-        conn.close()
         import logging
         logging.info('All SQLite tables ensured.')
 
 def ensure_default_admin():
     from auth.auth_utils import hash_password
-    conn = get_sqlite_connection()
-    if conn:
+    with writer_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE username=?", ('admin',))
         if not cursor.fetchone():
@@ -91,48 +169,320 @@ def ensure_default_admin():
             )
             conn.commit()
         cursor.close()
-        conn.close()
         import logging
         logging.info('Default admin user ensured.')
 
 def update_admin_password(username: str, new_hashed_password: str) -> bool:
     """Update the admin's password. Returns True if successful, False otherwise."""
-    conn = get_sqlite_connection()
-    if conn:
-        try:
+    try:
+        with writer_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE users SET password=? WHERE username=? AND role='admin'", (new_hashed_password, username))
             conn.commit()
             updated = cursor.rowcount > 0
             cursor.close()
-            conn.close()
-            return updated
-        except Exception as e:
-            import logging
-            logging.error(f'Error updating admin password: {e}')
-            return False
-    return False
+        return updated
+    except Exception as e:
+        import logging
+        logging.error(f'Error updating admin password: {e}')
+        return False
+
+def create_data_version_table():
+    with writer_connection() as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )''')
+        conn.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('performance_data', 0)")
+        conn.commit()
+
+def _bump_stored_data_version(cursor) -> int:
+    # In the caller's write transaction; returns the new stored version
+    cursor.execute("UPDATE data_versions SET version = version + 1 WHERE name = 'performance_data'")
+    row = cursor.execute("SELECT version FROM data_versions WHERE name = 'performance_data'").fetchone()
+    return row[0] if row else None
+
+def _check_stored_data_version():
+    # Invalidate the process-local caches if another process bumped the stored version
+    if time.monotonic() - _stored_version['checked'] < DATA_VERSION_CHECK_SECONDS:
+        return
+    with _perf_cache_lock:
+        if time.monotonic() - _stored_version['checked'] < DATA_VERSION_CHECK_SECONDS:
+            return
+        _stored_version['checked'] = time.monotonic()
+        try:
+            with pooled_connection() as conn:
+                row = conn.execute("SELECT version FROM data_versions WHERE name = 'performance_data'").fetchone()
+        except sqlite3.Error:
+            # Not migrated yet (see db/bootstrap.py)
+            return
+        stored = row[0] if row else None
+        if stored != _stored_version['seen']:
+            if _stored_version['seen'] is not None:
+                mark_performance_data_changed()
+            _stored_version['seen'] = stored
 
 # CRUD for performance_data
+def get_data_version() -> int:
+    """Return the current performance data version (bumped on every write)."""
+    _check_stored_data_version()
+    return _data_version
+
+def mark_performance_data_changed(changes: list = None):
+    """Invalidate the shared performance_data snapshot after a write.
+
+    ``changes`` optionally lists the written records as ``(row, delta)`` pairs
+    (delta 1 for an added row, -1 for a removed one); cached summaries are then
+    updated in place of being rebuilt.
+    """
+    global _data_version
+    with _perf_cache_lock:
+        _data_version += 1
+        # The stale snapshot is kept (the version check already rejects it) so it
+        # can still be served if the reload fails
+        _count_cache.clear()
+        for key, (version, filters, summary) in list(_summary_cache.items()):
+            if changes is None or version != _data_version - 1:
+                del _summary_cache[key]
+                continue
+            # Copy-on-write: sessions may be rendering the current summary
+            summary = summary.copy()
+            for row, delta in changes:
+                if _row_matches_filters(row, filters):
+                    summary.apply(row, delta)
+            _summary_cache[key] = (_data_version, filters, summary)
+
+def _compact_performance_frame(df):
+    # Typed in-memory form of performance_data rows: categoricals instead of
+    # per-row Python strings, completion_date as datetime64 with a precomputed
+    # monthly 'month' period, and 'associate_key', a small int code per associate
+    import pandas as pd
+    for col in PERFORMANCE_CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+    # Stored as ISO text, so the fixed format parses without per-row inference
+    df['completion_date'] = pd.to_datetime(df['completion_date'], format='%Y-%m-%d', errors='coerce')
+    return _derive_performance_columns(df)
+
+def _derive_performance_columns(df):
+    # Helper columns computed from the typed stored columns
+    df['month'] = df['completion_date'].dt.to_period('M')
+    df['associate_key'] = df['associate_id'].cat.codes
+    return df
+
+@timed('db.get_all_performance_data')
 def get_all_performance_data():
-    conn = get_sqlite_connection()
-    if conn:
+    # Serve the shared snapshot if nothing was written since it was loaded. A
+    # shallow copy lets callers add helper columns without touching the cache.
+    _check_stored_data_version()
+    with _perf_cache_lock:
+        if _perf_cache['df'] is not None and _perf_cache['version'] == _data_version:
+            return _perf_cache['df'].copy(deep=False)
+        version = _data_version
         try:
-            df = None
             import pandas as pd
-            df = pd.read_sql_query("SELECT * FROM performance_data", conn)
-            conn.close()
-            return df
+            incr('db.snapshot_reloads')
+            with pooled_connection() as conn:
+                df = _compact_performance_frame(pd.read_sql_query("SELECT * FROM performance_data", conn))
+            _perf_cache['df'] = df
+            _perf_cache['version'] = version
+            return df.copy(deep=False)
         except Exception as e:
             import logging
+            if _perf_cache['df'] is not None:
+                # Fall back to the last committed snapshot rather than an empty page
+                logging.warning(f'Error fetching performance data, serving previous snapshot: {e}')
+                return _perf_cache['df'].copy(deep=False)
             logging.error(f'Error fetching performance data: {e}')
             return None
-    return None
 
-def add_performance_record(data: dict) -> tuple[bool, str]:
-    conn = get_sqlite_connection()
-    if conn:
+def filter_state_key(filters: dict = None) -> tuple:
+    """Canonical, hashable form of the sidebar filter state, for cache keys."""
+    if not filters:
+        return ()
+    return tuple(sorted(
+        (name, tuple(str(v) for v in value) if isinstance(value, (list, tuple)) else str(value))
+        for name, value in filters.items()
+    ))
+
+def _row_matches_filters(row: dict, filters: dict = None) -> bool:
+    # Python counterpart of build_performance_filter_clause for a single record
+    filters = filters or {}
+    for col in FILTER_COLUMNS:
+        value = filters.get(col)
+        if value and value != 'All' and row.get(col) != value:
+            return False
+    date_range = filters.get('date_range')
+    if date_range and len(date_range) == 2:
+        day = str(row.get('completion_date'))[:10]
+        return str(date_range[0])[:10] <= day <= str(date_range[1])[:10]
+    return True
+
+def build_performance_filter_clause(filters: dict = None) -> tuple[str, list]:
+    """Translate sidebar filter state into a parameterized WHERE clause.
+
+    Returns ``(clause, params)``; the clause is empty when no filter is active.
+    'All' or an empty value means the column is not filtered.
+    """
+    filters = filters or {}
+    conditions, params = [], []
+    for col in FILTER_COLUMNS:
+        value = filters.get(col)
+        if value and value != 'All':
+            conditions.append(f"{col} = ?")
+            params.append(value)
+    date_range = filters.get('date_range')
+    if date_range and len(date_range) == 2:
+        # completion_date is stored as ISO 'YYYY-MM-DD' text, so string
+        # comparison matches date order and can use the index
+        conditions.append("completion_date BETWEEN ? AND ?")
+        params.extend([str(date_range[0])[:10], str(date_range[1])[:10]])
+    if not conditions:
+        return "", []
+    return " WHERE " + " AND ".join(conditions), params
+
+def get_performance_filter_index():
+    """Filter index (db.filter_index) over the shared snapshot, built once per data version."""
+    from db.filter_index import PerformanceFilterIndex
+    _check_stored_data_version()
+    with _perf_cache_lock:
+        index = _filter_index_cache['index']
+        if index is not None and _filter_index_cache['version'] == _data_version:
+            return index
+        df = get_all_performance_data()
+        if df is None:
+            return None
+        index = PerformanceFilterIndex(df, FILTER_COLUMNS)
+        # The version the snapshot was loaded at; a stale fallback snapshot is retried next time
+        _filter_index_cache['index'] = index
+        _filter_index_cache['version'] = _perf_cache['version']
+        return index
+
+@timed('db.get_filtered_performance_data')
+def get_filtered_performance_data(filters: dict = None):
+    """Return the performance_data rows matching the sidebar filters.
+
+    Answered from the in-memory filter index over the shared snapshot: bitmap AND
+    per column plus a binary search on completion_date, then one take() of the
+    matching rows. With no active filter the snapshot itself is returned.
+    """
+    index = get_performance_filter_index()
+    if index is None:
+        return None
+    positions = index.select(filters or {})
+    if positions is None:
+        return index.frame.copy(deep=False)
+    return index.frame.take(positions).reset_index(drop=True)
+
+@timed('db.get_performance_summary')
+def get_performance_summary(filters: dict = None):
+    """Summary counts (db.summary.PerformanceSummary) of the rows matching ``filters``.
+
+    Built in one pass over the filtered snapshot and cached per filter state until
+    the next write; single-record writes update cached summaries incrementally.
+    Returns None if the data cannot be read.
+    """
+    from db.summary import PerformanceSummary
+    key = filter_state_key(filters)
+    _check_stored_data_version()
+    with _perf_cache_lock:
+        cached = _summary_cache.get(key)
+        if cached is not None and cached[0] == _data_version:
+            return cached[2]
+        df = get_filtered_performance_data(filters)
+        if df is None:
+            return None
+        summary = PerformanceSummary.from_frame(df)
+        # Only cache a summary of current data, not of a stale fallback snapshot
+        if _filter_index_cache['version'] == _data_version:
+            if len(_summary_cache) >= _SUMMARY_CACHE_SIZE:
+                _summary_cache.pop(next(iter(_summary_cache)))
+            _summary_cache[key] = (_data_version, filters, summary)
+        return summary
+
+def _grid_filter_clause(filters: dict = None, search: str = '') -> tuple[str, list]:
+    # Sidebar filters plus a case-insensitive substring search over GRID_SEARCH_COLUMNS
+    clause, params = build_performance_filter_clause(filters)
+    search = (search or '').strip()
+    if search:
+        pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        condition = "(" + " OR ".join(f"{col} LIKE ? ESCAPE '\\'" for col in GRID_SEARCH_COLUMNS) + ")"
+        clause = f"{clause} AND {condition}" if clause else f" WHERE {condition}"
+        params = params + [pattern] * len(GRID_SEARCH_COLUMNS)
+    return clause, params
+
+@timed('db.count_performance_rows')
+def count_performance_rows(filters: dict = None, search: str = '') -> int:
+    """Number of performance_data rows matching ``filters`` and ``search``, cached until the next write."""
+    clause, params = _grid_filter_clause(filters, search)
+    key = (clause, tuple(params))
+    _check_stored_data_version()
+    with _perf_cache_lock:
+        cached = _count_cache.get(key)
+        if cached is not None and cached[0] == _data_version:
+            return cached[1]
+        version = _data_version
+    try:
+        with pooled_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM performance_data" + clause, params).fetchone()[0]
+        with _perf_cache_lock:
+            if version == _data_version:
+                if len(_count_cache) >= _COUNT_CACHE_SIZE:
+                    _count_cache.pop(next(iter(_count_cache)))
+                _count_cache[key] = (version, count)
+        return count
+    except Exception as e:
+        import logging
+        logging.error(f'Error counting performance data: {e}')
+        return 0
+
+@timed('db.get_performance_page')
+def get_performance_page(filters: dict = None, search: str = '', sort_by: str = 'id', descending: bool = False,
+                         page: int = 0, page_size: int = 100):
+    """Return one page of performance_data for the Data Management grid.
+
+    Filtering, sorting and paging run in SQLite (WHERE / ORDER BY / LIMIT / OFFSET),
+    so only ``page_size`` rows are read however large the table is. ``sort_by`` is
+    one of GRID_COLUMNS or 'id'; ties are broken on id so pages never overlap.
+    ``page`` is zero-based. The frame includes the id column.
+    """
+    if sort_by not in GRID_COLUMNS and sort_by != 'id':
+        raise ValueError(f"Cannot sort by {sort_by}")
+    clause, params = _grid_filter_clause(filters, search)
+    direction = 'DESC' if descending else 'ASC'
+    order = f"{sort_by} {direction}, id {direction}" if sort_by != 'id' else f"id {direction}"
+    try:
+        import pandas as pd
+        with pooled_connection() as conn:
+            return pd.read_sql_query(
+                f"SELECT id, {', '.join(GRID_COLUMNS)} FROM performance_data{clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                conn, params=params + [int(page_size), int(page) * int(page_size)])
+    except Exception as e:
+        import logging
+        logging.error(f'Error fetching performance page: {e}')
+        return None
+
+def iter_performance_rows(filters: dict = None, columns: tuple = PERFORMANCE_INSERT_COLUMNS, chunk_size: int = 10000):
+    """Yield performance_data rows matching ``filters`` in id order, as lists of up to ``chunk_size`` tuples.
+
+    Rows come from a single cursor (one read snapshot), so only one chunk is
+    held in memory at a time however large the result is.
+    """
+    clause, params = build_performance_filter_clause(filters)
+    with pooled_connection() as conn:
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM performance_data{clause} ORDER BY id", params)
         try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+@timed('db.add_performance_record')
+def add_performance_record(data: dict) -> tuple[bool, str]:
+    try:
+        with writer_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO performance_data (associate_id, associate_name, alliance_type, business_unit, geo, certification_name, completion_date, feedback)
@@ -141,21 +491,23 @@ def add_performance_record(data: dict) -> tuple[bool, str]:
                 data['associate_id'], data['associate_name'], data['alliance_type'], data['business_unit'], data['geo'],
                 data['certification_name'], data['completion_date'], data.get('feedback', None)
             ))
-            conn.commit()
+            new_row = _fetch_summary_row(cursor, cursor.lastrowid)
+            _apply_rollup_delta(cursor, data['completion_date'], data['alliance_type'], data['business_unit'], data['geo'], 1)
+            _commit_record_change(conn, [(new_row, 1)])
             cursor.close()
-            conn.close()
             return True, "Record added successfully."
-        except Exception as e:
-            import logging
-            logging.error(f'Error adding performance record: {e}')
-            return False, str(e)
-    return False, "Database connection failed."
+    except Exception as e:
+        import logging
+        logging.error(f'Error adding performance record: {e}')
+        return False, str(e)
 
+@timed('db.update_performance_record')
 def update_performance_record(record_id: int, data: dict) -> tuple[bool, str]:
-    conn = get_sqlite_connection()
-    if conn:
-        try:
+    try:
+        with writer_connection() as conn:
             cursor = conn.cursor()
+            old_row = _fetch_rollup_key(cursor, record_id)
+            old_record = _fetch_summary_row(cursor, record_id)
             cursor.execute("""
                 UPDATE performance_data SET associate_id=?, associate_name=?, alliance_type=?, business_unit=?, geo=?, certification_name=?, completion_date=?, feedback=?
                 WHERE id=?
@@ -163,167 +515,463 @@ def update_performance_record(record_id: int, data: dict) -> tuple[bool, str]:
                 data['associate_id'], data['associate_name'], data['alliance_type'], data['business_unit'], data['geo'],
                 data['certification_name'], data['completion_date'], data.get('feedback', None), record_id
             ))
-            conn.commit()
+            changes = []
+            if old_row and cursor.rowcount > 0:
+                _apply_rollup_delta(cursor, *old_row, -1)
+                _apply_rollup_delta(cursor, data['completion_date'], data['alliance_type'], data['business_unit'], data['geo'], 1)
+                changes = [(old_record, -1), (_fetch_summary_row(cursor, record_id), 1)]
+            _commit_record_change(conn, changes)
             cursor.close()
-            conn.close()
             return True, "Record updated successfully."
-        except Exception as e:
-            import logging
-            logging.error(f'Error updating performance record: {e}')
-            return False, str(e)
-    return False, "Database connection failed."
+    except Exception as e:
+        import logging
+        logging.error(f'Error updating performance record: {e}')
+        return False, str(e)
 
+@timed('db.delete_performance_record')
 def delete_performance_record(record_id: int) -> tuple[bool, str]:
-    conn = get_sqlite_connection()
-    if conn:
-        try:
+    try:
+        with writer_connection() as conn:
             cursor = conn.cursor()
+            old_row = _fetch_rollup_key(cursor, record_id)
+            old_record = _fetch_summary_row(cursor, record_id)
             cursor.execute("DELETE FROM performance_data WHERE id=?", (record_id,))
-            conn.commit()
+            changes = []
+            if old_row and cursor.rowcount > 0:
+                _apply_rollup_delta(cursor, *old_row, -1)
+                changes = [(old_record, -1)]
+            _commit_record_change(conn, changes)
             cursor.close()
-            conn.close()
             return True, "Record deleted successfully."
-        except Exception as e:
-            import logging
-            logging.error(f'Error deleting performance record: {e}')
-            return False, str(e)
-    return False, "Database connection failed."
+    except Exception as e:
+        import logging
+        logging.error(f'Error deleting performance record: {e}')
+        return False, str(e)
 
-# CRUD for global_metrics
-def get_all_global_metrics():
-    conn = get_sqlite_connection()
-    if conn:
-        try:
-            import pandas as pd
-            df = pd.read_sql_query("SELECT * FROM global_metrics", conn)
-            conn.close()
-            return df
-        except Exception as e:
-            import logging
-            logging.error(f'Error fetching global metrics: {e}')
-            return None
-    return None
+@timed('db.delete_all_performance_data')
+def delete_all_performance_data() -> tuple[bool, str]:
+    try:
+        with writer_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM performance_data")
+            _rebuild_rollup(cursor)
+            conn.commit()
+            cursor.close()
+        mark_performance_data_changed()
+        return True, "All performance records deleted."
+    except Exception as e:
+        import logging
+        logging.error(f'Error deleting all performance records: {e}')
+        return False, str(e)
 
-def overwrite_global_metrics(df: 'pd.DataFrame') -> (bool, str):
-    conn = get_sqlite_connection()
-    if conn:
-        try:
+def _insert_performance_rows(cursor, df) -> int:
+    # Build parameter tuples straight from the column arrays; no per-row dicts
+    columns = [_column_values(df, col) for col in PERFORMANCE_INSERT_COLUMNS]
+    cursor.executemany(
+        f"INSERT INTO performance_data ({', '.join(PERFORMANCE_INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(PERFORMANCE_INSERT_COLUMNS))})",
+        zip(*columns)
+    )
+    return len(df)
+
+@timed('db.restore_performance_data')
+def restore_performance_data(df: 'pd.DataFrame') -> tuple[bool, str]:
+    """Replace performance_data with a typed snapshot frame and serve it as the shared snapshot.
+
+    ``df`` holds PERFORMANCE_STORED_COLUMNS in the in-memory form of
+    get_all_performance_data (as read by db/columnar_snapshot.py); rows keep
+    their ids and created_at. The next reader gets the frame without a reload.
+    """
+    try:
+        stored = df[list(PERFORMANCE_STORED_COLUMNS)].copy()
+        stored['completion_date'] = stored['completion_date'].dt.strftime('%Y-%m-%d')
+        columns = [_column_values(stored, col) for col in PERFORMANCE_STORED_COLUMNS]
+        with _bulk_writer_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM global_metrics")
-            for _, row in df.iterrows():
-                cursor.execute("INSERT INTO global_metrics (metric_name, value, geo) VALUES (?, ?, ?)",
-                               (row['metric_name'], row['value'], row.get('geo', None)))
+            cursor.execute("DELETE FROM performance_data")
+            cursor.executemany(
+                f"INSERT INTO performance_data ({', '.join(PERFORMANCE_STORED_COLUMNS)}) VALUES ({', '.join('?' * len(PERFORMANCE_STORED_COLUMNS))})",
+                zip(*columns)
+            )
+            _rebuild_rollup(cursor)
+            # Restores also run from the command line; running apps see this bump
+            stored_version = _bump_stored_data_version(cursor)
             conn.commit()
             cursor.close()
-            conn.close()
-            return True, "Global metrics updated."
-        except Exception as e:
-            import logging
-            logging.error(f'Error updating global metrics: {e}')
-            return False, str(e)
-    return False, "Database connection failed."
+    except Exception as e:
+        import logging
+        logging.error(f'Error restoring performance data: {e}')
+        return False, str(e)
+    with _perf_cache_lock:
+        # Marked and primed under one lock hold, so no other write slips in between
+        _stored_version['seen'] = stored_version
+        mark_performance_data_changed()
+        _perf_cache['df'] = _derive_performance_columns(df.copy(deep=False))
+        _perf_cache['version'] = _data_version
+    return True, f"{len(df)} records restored."
 
-# CRUD for bu_metrics
-def get_all_bu_metrics():
-    conn = get_sqlite_connection()
-    if conn:
-        try:
-            import pandas as pd
-            df = pd.read_sql_query("SELECT * FROM bu_metrics", conn)
-            conn.close()
-            return df
-        except Exception as e:
-            import logging
-            logging.error(f'Error fetching BU metrics: {e}')
-            return None
-    return None
+def _keyed_row_hashes(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    # Natural key plus an occurrence ordinal, so repeated keys (the same associate
+    # completing the same activity twice on one day) still pair up one-to-one,
+    # and a content hash over every stored column
+    import pandas as pd
+    key_cols = list(NATURAL_KEY_COLUMNS)
+    keyed = df[key_cols].astype(object).reset_index(drop=True)
+    keyed['occurrence'] = keyed.groupby(key_cols, sort=False, dropna=False).cumcount()
+    content = df[list(PERFORMANCE_INSERT_COLUMNS)].astype(object).reset_index(drop=True)
+    keyed['row_hash'] = pd.util.hash_pandas_object(content.where(content.notna(), None), index=False).to_numpy()
+    return keyed
 
-def overwrite_bu_metrics(df: 'pd.DataFrame') -> (bool, str):
-    conn = get_sqlite_connection()
-    if conn:
-        try:
+def _sync_performance_rows(conn, cursor, df: 'pd.DataFrame') -> tuple[int, int, int]:
+    # Diff ``df`` against the stored rows and apply only the differences inside
+    # the caller's transaction. Returns (added, changed, removed).
+    import pandas as pd
+    # The caller holds writer_connection(), taken before the read below, so
+    # nothing changes between diff and apply
+    existing = pd.read_sql_query(
+        f"SELECT id, {', '.join(PERFORMANCE_INSERT_COLUMNS)} FROM performance_data ORDER BY id", conn)
+    incoming = _keyed_row_hashes(df)
+    incoming['position'] = range(len(incoming))
+    current = _keyed_row_hashes(existing)
+    current['id'] = existing['id'].to_numpy()
+    key_cols = list(NATURAL_KEY_COLUMNS) + ['occurrence']
+    merged = incoming.merge(current, on=key_cols, how='outer', suffixes=('', '_db'), indicator=True)
+    added = merged.loc[merged['_merge'] == 'left_only', 'position'].astype(int).to_numpy()
+    removed = merged.loc[merged['_merge'] == 'right_only', 'id'].astype(int).tolist()
+    changed = merged[(merged['_merge'] == 'both') & (merged['row_hash'] != merged['row_hash_db'])]
+    if removed:
+        cursor.executemany("DELETE FROM performance_data WHERE id=?", [(record_id,) for record_id in removed])
+    if len(changed):
+        updates = df.iloc[changed['position'].astype(int).to_numpy()]
+        columns = [_column_values(updates, col) for col in PERFORMANCE_INSERT_COLUMNS]
+        cursor.executemany(
+            f"UPDATE performance_data SET {', '.join(f'{col}=?' for col in PERFORMANCE_INSERT_COLUMNS)} WHERE id=?",
+            zip(*columns, changed['id'].astype(int).tolist())
+        )
+    if len(added):
+        _insert_performance_rows(cursor, df.iloc[added])
+    if removed or len(changed) or len(added):
+        _rebuild_rollup(cursor)
+    return len(added), len(changed), len(removed)
+
+@timed('db.replace_performance_data_chunked')
+def replace_performance_data_chunked(chunks, on_progress=None, max_errors: int = STREAMING_MAX_ERRORS,
+                                     tables: dict = None) -> tuple[bool, str]:
+    """Replace performance_data with streamed chunks in a single transaction.
+
+    ``chunks`` yields ``(clean, bad_rows, rows_read, total_rows)`` as produced by
+    utils.excel_parser.iter_performance_chunks. Any invalid row rejects the whole
+    load: inserting stops and the transaction is rolled back, and reading continues
+    only until ``max_errors`` bad rows are collected. ``on_progress(rows_read,
+    total_rows)`` is called after every chunk. ``tables`` (table -> frame, see
+    replace_workbook_data) are replaced in the same transaction.
+    """
+    from utils.excel_parser import format_row_errors
+    try:
+        with writer_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM bu_metrics")
-            for _, row in df.iterrows():
-                cursor.execute("INSERT INTO bu_metrics (business_unit, target, completed, achievement_percent) VALUES (?, ?, ?, ?)",
-                               (row['business_unit'], row['target'], row['completed'], row.get('achievement_percent', None)))
+            cursor.execute("DELETE FROM performance_data")
+            bad_rows, inserted, skipped = [], 0, 0
+            for clean, chunk_bad_rows, rows_read, total_rows in chunks:
+                bad_rows.extend(chunk_bad_rows.tolist())
+                if not bad_rows:
+                    inserted += _insert_performance_rows(cursor, clean)
+                    skipped += clean.attrs.get('skipped_rows', 0)
+                if on_progress:
+                    on_progress(rows_read, total_rows)
+                if len(bad_rows) >= max_errors:
+                    break
+            if bad_rows:
+                conn.rollback()
+                cursor.close()
+                message = format_row_errors(bad_rows[:max_errors], "Invalid date format in 'Completion Date'")
+                if len(bad_rows) >= max_errors:
+                    message += f" Stopped after the first {max_errors} errors."
+                return False, message
+            _rebuild_rollup(cursor)
+            for table, df in (tables or {}).items():
+                _replace_rows(cursor, table, df)
             conn.commit()
             cursor.close()
-            conn.close()
-            return True, "BU metrics updated."
-        except Exception as e:
-            import logging
-            logging.error(f'Error updating BU metrics: {e}')
-            return False, str(e)
-    return False, "Database connection failed."
+    except Exception as e:
+        import logging
+        logging.error(f'Error loading performance data: {e}')
+        return False, str(e)
+    mark_performance_data_changed()
+    message = f"{inserted} records loaded."
+    if skipped:
+        message += f" {skipped} rows with missing required values were skipped."
+    if tables:
+        message += " " + " ".join(f"{METRICS_TABLES[table][0]}: {len(df)} rows." for table, df in tables.items())
+    return True, message
 
-# CRUD for alliance_metrics
-def get_all_alliance_metrics():
-    conn = get_sqlite_connection()
-    if conn:
+# Rollup of performance_data for the dashboard charts
+def _rebuild_rollup(cursor):
+    cursor.execute("DELETE FROM performance_rollup")
+    cursor.execute("""
+        INSERT INTO performance_rollup (month, alliance_type, business_unit, geo, certifications)
+        SELECT substr(completion_date, 1, 7), alliance_type, business_unit, geo, COUNT(*)
+        FROM performance_data
+        GROUP BY 1, 2, 3, 4
+    """)
+
+def _fetch_rollup_key(cursor, record_id: int):
+    cursor.execute("SELECT completion_date, alliance_type, business_unit, geo FROM performance_data WHERE id=?", (record_id,))
+    return cursor.fetchone()
+
+def _fetch_summary_row(cursor, record_id: int):
+    # The stored values of one record, as a dict for PerformanceSummary.apply
+    from db.summary import SUMMARY_COLUMNS
+    columns = SUMMARY_COLUMNS + ('completion_date',)
+    cursor.execute(f"SELECT {', '.join(columns)} FROM performance_data WHERE id=?", (record_id,))
+    row = cursor.fetchone()
+    return dict(zip(columns, row)) if row else None
+
+def _commit_record_change(conn, changes: list):
+    # Commit and publish under the snapshot lock, so no reader can load the new
+    # row into a summary between the commit and the incremental update
+    with _perf_cache_lock:
+        conn.commit()
+        mark_performance_data_changed(changes)
+
+def _apply_rollup_delta(cursor, completion_date, alliance_type, business_unit, geo, delta: int):
+    # Adjust a single rollup cell in the caller's transaction; cells that drop to
+    # zero are removed so the rollup only ever holds groups that have data
+    key = (str(completion_date)[:7], alliance_type, business_unit, geo)
+    cursor.execute("""
+        INSERT INTO performance_rollup (month, alliance_type, business_unit, geo, certifications)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(month, alliance_type, business_unit, geo)
+        DO UPDATE SET certifications = certifications + excluded.certifications
+    """, key + (delta,))
+    cursor.execute("""
+        DELETE FROM performance_rollup
+        WHERE month=? AND alliance_type=? AND business_unit=? AND geo=? AND certifications <= 0
+    """, key)
+
+@timed('db.get_performance_rollup')
+def get_performance_rollup(filters: dict = None):
+    """Return certification counts per (month, alliance_type, business_unit, geo).
+
+    ``filters`` uses the same keys as the sidebar filter state: alliance_type,
+    business_unit, geo ('All' or missing means no filter) and date_range.
+    """
+    import pandas as pd
+    filters = filters or {}
+    date_range = filters.get('date_range')
+    if date_range and len(date_range) == 2:
+        # A day-level date range cannot be answered from monthly cells, so
+        # aggregate the matching rows in SQLite instead
+        clause, params = build_performance_filter_clause(filters)
         try:
-            import pandas as pd
-            df = pd.read_sql_query("SELECT * FROM alliance_metrics", conn)
-            conn.close()
-            return df
+            with pooled_connection() as conn:
+                rollup = pd.read_sql_query(f"""
+                    SELECT substr(completion_date, 1, 7) AS month, alliance_type, business_unit, geo,
+                           COUNT(*) AS certifications
+                    FROM performance_data{clause}
+                    GROUP BY 1, 2, 3, 4
+                """, conn, params=params)
         except Exception as e:
             import logging
-            logging.error(f'Error fetching alliance metrics: {e}')
+            logging.error(f'Error fetching performance rollup: {e}')
             return None
-    return None
+        return rollup
+    _check_stored_data_version()
+    with _perf_cache_lock:
+        if _rollup_cache['df'] is None or _rollup_cache['version'] != _data_version:
+            version = _data_version
+            try:
+                with pooled_connection() as conn:
+                    _rollup_cache['df'] = pd.read_sql_query(
+                        "SELECT month, alliance_type, business_unit, geo, certifications FROM performance_rollup", conn)
+                _rollup_cache['version'] = version
+            except Exception as e:
+                import logging
+                logging.error(f'Error fetching performance rollup: {e}')
+                return None
+        rollup = _rollup_cache['df']
+    for col in FILTER_COLUMNS:
+        if filters.get(col) and filters[col] != 'All':
+            rollup = rollup[rollup[col] == filters[col]]
+    return rollup.copy(deep=False)
 
-def overwrite_alliance_metrics(df: 'pd.DataFrame') -> (bool, str):
-    conn = get_sqlite_connection()
-    if conn:
+@timed('db.get_filter_options')
+def get_filter_options() -> dict:
+    """Distinct alliance/BU/geo values for the sidebar selectboxes, kept sorted by the filter index."""
+    index = get_performance_filter_index()
+    if index is None:
+        return {col: [] for col in FILTER_COLUMNS}
+    return {col: list(index.options[col]) for col in FILTER_COLUMNS}
+
+def rollup_counts(rollup, by):
+    """Sum rollup cells into a 'Certifications' count per value of ``by``."""
+    return rollup.groupby(by, as_index=False)['certifications'].sum().rename(columns={'certifications': 'Certifications'})
+
+# Shared bulk-replace engine for the metric tables
+# (synchronous=NORMAL and temp_store=MEMORY are already set on every pooled connection)
+# Page cache for bulk writes, in KiB; only for the write, as the connection goes back to the pool
+BULK_WRITE_CACHE_KIB = 65536
+
+@contextmanager
+def _bulk_writer_connection():
+    # writer_connection() with a larger page cache, restored to the connection's
+    # previous size (freeing the extra pages) once the write is done
+    with writer_connection() as conn:
+        previous = conn.execute("PRAGMA cache_size").fetchone()[0]
+        conn.execute(f"PRAGMA cache_size=-{BULK_WRITE_CACHE_KIB}")
         try:
+            yield conn
+        finally:
+            conn.execute(f"PRAGMA cache_size={int(previous)}")
+
+def _column_values(df, col) -> list:
+    # Native Python values for sqlite3 (numpy ints would be stored as BLOBs), NaN -> NULL
+    if col not in df.columns:
+        return [None] * len(df)
+    values = df[col].astype(object)
+    return values.where(values.notna(), None).tolist()
+
+def _replace_rows(cursor, table: str, df: 'pd.DataFrame'):
+    # DELETE + executemany INSERT of a METRICS_TABLES table inside the caller's transaction
+    label, columns, required = METRICS_TABLES[table]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        raise ValueError(f"{label}: missing column(s): {', '.join(missing)}")
+    params = zip(*(_column_values(df, col) for col in columns))
+    cursor.execute(f"DELETE FROM {table}")
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", params)
+
+@timed('db.bulk_replace')
+def _bulk_replace(table: str, df: 'pd.DataFrame') -> int:
+    """Replace every row of ``table`` (one of METRICS_TABLES) with ``df`` in a single transaction.
+
+    Parameters are built from whole columns and written with one executemany. The
+    DELETE and INSERT commit together, so readers see the old rows until the new
+    ones are complete and never a half-empty table. The table's required columns
+    must be present in ``df``; other missing columns are written as NULL.
+    """
+    with _bulk_writer_connection() as conn:
+        cursor = conn.cursor()
+        _replace_rows(cursor, table, df)
+        conn.commit()
+        cursor.close()
+    return len(df)
+
+@timed('db.replace_workbook_data')
+def replace_workbook_data(frames: dict, performance_mode: str = 'replace') -> tuple[bool, str]:
+    """Load every table parsed from a workbook (see utils.excel_parser.parse_workbook) in one transaction.
+
+    ``frames`` maps 'performance_data' and/or METRICS_TABLES names to cleaned
+    frames; tables without a frame are left as they are. performance_data is
+    replaced or, with ``performance_mode='sync'``, updated incrementally; the
+    other tables are overwritten. Either every table changes or none does. The
+    data is marked changed once committed.
+    """
+    try:
+        with _bulk_writer_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM alliance_metrics")
-            for _, row in df.iterrows():
-                cursor.execute("INSERT INTO alliance_metrics (partner_name, business_unit, target, completed) VALUES (?, ?, ?, ?)",
-                               (row['partner_name'], row.get('business_unit', None), row.get('target', None), row.get('completed', None)))
+            messages = []
+            df = frames.get('performance_data')
+            if df is not None:
+                if performance_mode == 'sync':
+                    added, changed, removed = _sync_performance_rows(conn, cursor, df)
+                    messages.append(f"{added} records added, {changed} changed, {removed} removed.")
+                else:
+                    cursor.execute("DELETE FROM performance_data")
+                    messages.append(f"{_insert_performance_rows(cursor, df)} records loaded.")
+                    _rebuild_rollup(cursor)
+            for table, label in ((table, spec[0]) for table, spec in METRICS_TABLES.items()):
+                if frames.get(table) is not None:
+                    _replace_rows(cursor, table, frames[table])
+                    messages.append(f"{label}: {len(frames[table])} rows.")
             conn.commit()
             cursor.close()
-            conn.close()
-            return True, "Alliance metrics updated."
-        except Exception as e:
-            import logging
-            logging.error(f'Error updating alliance metrics: {e}')
-            return False, str(e)
-    return False, "Database connection failed."
+    except Exception as e:
+        import logging
+        logging.error(f'Error loading workbook data: {e}')
+        return False, str(e)
+    mark_performance_data_changed()
+    return True, " ".join(messages)
+
+# CRUD for global_metrics
+def get_all_global_metrics():
+    try:
+        import pandas as pd
+        with pooled_connection() as conn:
+            return pd.read_sql_query("SELECT * FROM global_metrics", conn)
+    except Exception as e:
+        import logging
+        logging.error(f'Error fetching global metrics: {e}')
+        return None
+
+def overwrite_global_metrics(df: 'pd.DataFrame') -> (bool, str):
+    try:
+        _bulk_replace('global_metrics', df)
+        return True, "Global metrics updated."
+    except Exception as e:
+        import logging
+        logging.error(f'Error updating global metrics: {e}')
+        return False, str(e)
+
+# CRUD for bu_metrics
+def get_all_bu_metrics():
+    try:
+        import pandas as pd
+        with pooled_connection() as conn:
+            return pd.read_sql_query("SELECT * FROM bu_metrics", conn)
+    except Exception as e:
+        import logging
+        logging.error(f'Error fetching BU metrics: {e}')
+        return None
+
+def overwrite_bu_metrics(df: 'pd.DataFrame') -> (bool, str):
+    try:
+        _bulk_replace('bu_metrics', df)
+        return True, "BU metrics updated."
+    except Exception as e:
+        import logging
+        logging.error(f'Error updating BU metrics: {e}')
+        return False, str(e)
+
+# CRUD for alliance_metrics
+def get_all_alliance_metrics():
+    try:
+        import pandas as pd
+        with pooled_connection() as conn:
+            return pd.read_sql_query("SELECT * FROM alliance_metrics", conn)
+    except Exception as e:
+        import logging
+        logging.error(f'Error fetching alliance metrics: {e}')
+        return None
+
+def overwrite_alliance_metrics(df: 'pd.DataFrame') -> (bool, str):
+    try:
+        _bulk_replace('alliance_metrics', df)
+        return True, "Alliance metrics updated."
+    except Exception as e:
+        import logging
+        logging.error(f'Error updating alliance metrics: {e}')
+        return False, str(e)
 
 # CRUD for cost_savings
 def get_all_cost_savings():
-    conn = get_sqlite_connection()
-    if conn:
-        try:
-            import pandas as pd
-            df = pd.read_sql_query("SELECT * FROM cost_savings", conn)
-            conn.close()
-            return df
-        except Exception as e:
-            import logging
-            logging.error(f'Error fetching cost savings: {e}')
-            return None
-    return None
+    try:
+        import pandas as pd
+        with pooled_connection() as conn:
+            return pd.read_sql_query("SELECT * FROM cost_savings", conn)
+    except Exception as e:
+        import logging
+        logging.error(f'Error fetching cost savings: {e}')
+        return None
 
 def overwrite_cost_savings(df: 'pd.DataFrame') -> (bool, str):
-    conn = get_sqlite_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM cost_savings")
-            for _, row in df.iterrows():
-                cursor.execute("INSERT INTO cost_savings (partner_name, enablement_saving, certification_saving, total) VALUES (?, ?, ?, ?)",
-                               (row['partner_name'], row.get('enablement_saving', None), row.get('certification_saving', None), row.get('total', None)))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True, "Cost savings updated."
-        except Exception as e:
-            import logging
-            logging.error(f'Error updating cost savings: {e}')
-            return False, str(e)
-    return False, "Database connection failed."
+    try:
+        _bulk_replace('cost_savings', df)
+        return True, "Cost savings updated."
+    except Exception as e:
+        import logging
+        logging.error(f'Error updating cost savings: {e}')
+        return False, str(e)
 
 # Utility: Validate and standardize date, number fields for upload
 def clean_date(date_val):
@@ -0,0 +1,62 @@
+# In-memory filter index over the cached performance_data frame
+#
+# Holds one packed row bitmap per distinct alliance_type / business_unit / geo
+# value and the row order sorted by completion_date. A sidebar filter combination
+# is answered by ANDing bitmaps and binary-searching the dates; the frame itself
+# is only touched to take the matching rows.
+
+import numpy as np
+import pandas as pd
+
+class PerformanceFilterIndex:
+    """Bitmap and date index over one performance_data snapshot (see get_all_performance_data)."""
+
+    def __init__(self, df: pd.DataFrame, columns: tuple):
+        self.frame = df
+        self.size = len(df)
+        self.bitmaps = {}
+        self.options = {}
+        for col in columns:
+            values = df[col]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            codes = values.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+            # Values with no rows (categories can outlive their rows) get no bitmap
+            self.bitmaps[col] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(values.cat.categories) if counts[code]
+            }
+            self.options[col] = sorted(self.bitmaps[col])
+        dates = df['completion_date'].to_numpy(dtype='datetime64[ns]')
+        self.date_order = np.argsort(dates, kind='stable')
+        self.sorted_dates = dates[self.date_order]
+
+    def _date_positions(self, date_range) -> np.ndarray:
+        # completion_date has no time part, so an inclusive end is 'right' of the end day
+        start = np.datetime64(str(date_range[0])[:10], 'ns')
+        end = np.datetime64(str(date_range[1])[:10], 'ns')
+        lo = np.searchsorted(self.sorted_dates, start, side='left')
+        hi = np.searchsorted(self.sorted_dates, end, side='right')
+        return self.date_order[lo:hi]
+
+    def select(self, filters: dict):
+        """Row positions matching ``filters`` (sidebar keys), ascending; None if nothing is filtered."""
+        bitmap = None
+        for col, bitmaps in self.bitmaps.items():
+            value = filters.get(col)
+            if not value or value == 'All':
+                continue
+            if value not in bitmaps:
+                return np.array([], dtype=np.intp)
+            bitmap = bitmaps[value] if bitmap is None else bitmap & bitmaps[value]
+        date_range = filters.get('date_range')
+        has_dates = bool(date_range) and len(date_range) == 2
+        if bitmap is None:
+            return np.sort(self._date_positions(date_range)) if has_dates else None
+        mask = np.unpackbits(bitmap, count=self.size).view(bool)
+        if has_dates:
+            in_range = np.zeros(self.size, dtype=bool)
+            in_range[self._date_positions(date_range)] = True
+            mask &= in_range
+        return np.flatnonzero(mask)
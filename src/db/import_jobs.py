@@ -0,0 +1,99 @@
+# Persistent state of background import jobs (see utils/import_runner.py)
+#
+# Jobs are kept in a separate SQLite file (IMPORT_JOBS_DB_PATH). A load into
+# performance_data holds the main database's write lock for its whole
+# transaction, and progress has to be written, and read by the polling UI,
+# while that transaction is open. Each call here opens a short-lived
+# connection; the table is small and the writes are single rows.
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from config import IMPORT_JOBS_DB_PATH, SQLITE_BUSY_TIMEOUT
+
+# queued -> parsing -> inserting -> done | failed
+ACTIVE_IMPORT_STATUSES = ('queued', 'parsing', 'inserting')
+FINISHED_IMPORT_STATUSES = ('done', 'failed')
+# Columns update_import_job may set
+IMPORT_JOB_FIELDS = ('status', 'rows_total', 'rows_processed', 'message', 'errors', 'backup_path')
+
+_ready = False
+_ready_lock = threading.Lock()
+
+@contextmanager
+def _jobs_connection():
+    conn = sqlite3.connect(IMPORT_JOBS_DB_PATH, timeout=SQLITE_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    try:
+        _ensure_table(conn)
+        yield conn
+    finally:
+        conn.close()
+
+def _ensure_table(conn):
+    # Created on first use in a process; jobs still marked active at that point
+    # were cut off by a restart, since their worker threads died with it
+    global _ready
+    if _ready:
+        return
+    with _ready_lock:
+        if _ready:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS import_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT,
+            mode TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            rows_total INTEGER,
+            rows_processed INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            errors TEXT,
+            backup_path TEXT,
+            created_by TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            started_at TEXT,
+            finished_at TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )''')
+        placeholders = ', '.join('?' * len(ACTIVE_IMPORT_STATUSES))
+        conn.execute(f"""
+            UPDATE import_jobs SET status = 'failed', message = 'Interrupted by an application restart.',
+                finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE status IN ({placeholders})""", ACTIVE_IMPORT_STATUSES)
+        conn.commit()
+        _ready = True
+
+def create_import_job(filename: str, mode: str, created_by: str = None) -> int:
+    """Record a new queued job and return its id."""
+    with _jobs_connection() as conn:
+        cursor = conn.execute("INSERT INTO import_jobs (filename, mode, created_by) VALUES (?, ?, ?)",
+                              (filename, mode, created_by))
+        conn.commit()
+        return cursor.lastrowid
+
+def update_import_job(job_id: int, **fields):
+    """Set any of IMPORT_JOB_FIELDS on a job; start/finish times follow the status."""
+    unknown = set(fields) - set(IMPORT_JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown import job fields: {', '.join(sorted(unknown))}")
+    assignments = [f"{name} = ?" for name in fields] + ["updated_at = CURRENT_TIMESTAMP"]
+    status = fields.get('status')
+    if status in ACTIVE_IMPORT_STATUSES and status != 'queued':
+        assignments.append("started_at = COALESCE(started_at, CURRENT_TIMESTAMP)")
+    elif status in FINISHED_IMPORT_STATUSES:
+        assignments.append("finished_at = CURRENT_TIMESTAMP")
+    with _jobs_connection() as conn:
+        conn.execute(f"UPDATE import_jobs SET {', '.join(assignments)} WHERE id = ?", list(fields.values()) + [job_id])
+        conn.commit()
+
+def get_import_job(job_id: int) -> dict:
+    with _jobs_connection() as conn:
+        row = conn.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+def list_import_jobs(limit: int = 5) -> list:
+    """Most recent jobs first."""
+    with _jobs_connection() as conn:
+        rows = conn.execute("SELECT * FROM import_jobs ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+    return [dict(row) for row in rows]
@@ -0,0 +1,141 @@
+# Summary statistics for the dashboard summary tiles and column table
+#
+# One pass over the typed performance frame builds a value -> count table per
+# summarised column (plus per day of completion_date). Every KPI tile (best
+# alliance/BU/geo, top associate, totals, unique counts), the monthly counts and
+# the column stats are read off those tables, and a single added, updated or
+# deleted record is applied as a +1/-1 change instead of a rebuild.
+
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+# Columns counted per value; free text (feedback) and bookkeeping columns are not
+SUMMARY_COLUMNS = (
+    'alliance_type', 'business_unit', 'geo', 'associate_id',
+    'associate_name', 'activity_code', 'certification_name'
+)
+
+def _day(value):
+    # 'YYYY-MM-DD' for a stored date, None if it does not parse (as the typed loader)
+    parsed = pd.to_datetime(value, format='%Y-%m-%d', errors='coerce') if isinstance(value, str) else pd.to_datetime(value, errors='coerce')
+    return None if pd.isna(parsed) else parsed.strftime('%Y-%m-%d')
+
+class ValueCounts:
+    """Counts per distinct value of one column, as a numpy array aligned with ``values``."""
+
+    def __init__(self, values: list, counts: np.ndarray):
+        self.values = values
+        self.counts = counts
+        self._positions = None  # value -> position, built on the first incremental change
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> 'ValueCounts':
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('category')
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories)).astype(np.int64)
+        return cls(list(series.cat.categories), counts)
+
+    def copy(self) -> 'ValueCounts':
+        # values/positions are never modified in place (add replaces them), so the
+        # copy can share them
+        copied = ValueCounts(self.values, self.counts.copy())
+        copied._positions = self._positions
+        return copied
+
+    def add(self, value, delta: int):
+        if self._positions is None:
+            self._positions = {v: i for i, v in enumerate(self.values)}
+        position = self._positions.get(value)
+        if position is None:
+            if delta < 0:
+                return
+            self.values = self.values + [value]
+            self._positions = dict(self._positions)
+            self._positions[value] = position = len(self.values) - 1
+            self.counts = np.append(self.counts, 0)
+        self.counts[position] = max(self.counts[position] + delta, 0)
+
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def unique(self) -> int:
+        return int(np.count_nonzero(self.counts))
+
+    def best(self):
+        """Most frequent value and its count; ties go to the smallest value, like mode()."""
+        if not self.counts.size or not self.counts.max():
+            return '-', 0
+        top = self.counts.max()
+        value = min((self.values[i] for i in np.flatnonzero(self.counts == top)), key=str)
+        return value, int(top)
+
+class PerformanceSummary:
+    """Per-value counts over a set of performance_data rows."""
+
+    def __init__(self):
+        self.total = 0
+        self.counts = {col: ValueCounts([], np.zeros(0, dtype=np.int64)) for col in SUMMARY_COLUMNS}
+        self.days = Counter()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'PerformanceSummary':
+        """Build from a frame as returned by get_all_performance_data / get_filtered_performance_data."""
+        summary = cls()
+        summary.total = len(df)
+        for col in SUMMARY_COLUMNS:
+            if col in df.columns:
+                summary.counts[col] = ValueCounts.from_series(df[col])
+        dates = df['completion_date'].dropna()
+        summary.days = Counter({day.strftime('%Y-%m-%d'): int(n) for day, n in dates.value_counts().items()})
+        return summary
+
+    def copy(self) -> 'PerformanceSummary':
+        summary = PerformanceSummary()
+        summary.total = self.total
+        summary.counts = {col: counts.copy() for col, counts in self.counts.items()}
+        summary.days = Counter(self.days)
+        return summary
+
+    def apply(self, row: dict, delta: int):
+        """Add (delta=1) or remove (delta=-1) one record given as a column -> value dict."""
+        self.total += delta
+        for col in SUMMARY_COLUMNS:
+            value = row.get(col)
+            if value is not None and value == value:
+                self.counts[col].add(value, delta)
+        day = _day(row.get('completion_date'))
+        if day is not None:
+            self.days[day] += delta
+            if self.days[day] <= 0:
+                del self.days[day]
+
+    def best(self, col: str):
+        """Most frequent value of ``col`` and its count ('-', 0 when there are no rows)."""
+        return self.counts[col].best()
+
+    def unique(self, col: str) -> int:
+        return self.counts[col].unique()
+
+    def monthly(self) -> pd.DataFrame:
+        """Certifications per 'YYYY-MM' month, in month order."""
+        months = Counter()
+        for day, n in self.days.items():
+            months[day[:7]] += n
+        return pd.DataFrame(sorted(months.items()), columns=['Month', 'Certifications'])
+
+    def column_stats(self) -> pd.DataFrame:
+        """count / unique / top / freq per summarised column, plus first/last completion date."""
+        rows = {}
+        for col in SUMMARY_COLUMNS:
+            top, freq = self.best(col)
+            rows[col] = {'count': self.counts[col].total(), 'unique': self.unique(col),
+                         'top': top, 'freq': freq, 'first': '', 'last': ''}
+        days = sorted(self.days)
+        rows['completion_date'] = {
+            'count': sum(self.days.values()), 'unique': len(days), 'top': '', 'freq': '',
+            'first': days[0] if days else '', 'last': days[-1] if days else '',
+        }
+        # Shown as text: the columns mix counts, values and dates
+        return pd.DataFrame.from_dict(rows, orient='index').astype(str)
@@ -1,10 +1,20 @@
 import streamlit as st
-import pandas as pd
-from db.database_operations import get_all_performance_data, add_performance_record, update_performance_record, delete_performance_record
-from utils.excel_parser import parse_performance_data
+from db.database_operations import count_performance_rows, get_performance_page, GRID_COLUMNS, add_performance_record, update_performance_record, delete_performance_record, delete_all_performance_data
+from db.import_jobs import list_import_jobs, ACTIVE_IMPORT_STATUSES
+from utils.import_runner import submit_import, submit_snapshot_restore, submit_report_pack
+from db.columnar_snapshot import get_snapshot_info
+from utils.backup_store import list_backups, read_backup
+from config import STREAMING_UPLOAD_THRESHOLD_BYTES, GRID_PAGE_SIZE, IMPORT_POLL_SECONDS
+from utils.figure_cache import cached_figure
+from ui.reports import export_dataframe
+from utils.instrumentation import timed, timer
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 
-def render_dashboard_summary(df):
+def render_dashboard_summary(summary, version: int = None):
+    """KPI tiles, monthly trend and column stats from a PerformanceSummary (see get_performance_summary).
+
+    ``version`` is the data version read before the summary was fetched.
+    """
     import streamlit as st
     import plotly.express as px
     # Fallback: use emoji directly in metric labels, no emoji_icon import
@@ -12,15 +22,11 @@ def render_dashboard_summary(df):
         return e
     st.markdown("## 🏆 Dashboard Summary")
     col1, col2, col3, col4, col5 = st.columns(5)
-    # Best Alliance
-    best_alliance = df['alliance_type'].mode()[0] if not df.empty else '-'
-    # Best BU
-    best_bu = df['business_unit'].mode()[0] if not df.empty else '-'
-    # Best Geo
-    best_geo = df['geo'].mode()[0] if not df.empty else '-'
-    # Best Associate
-    best_associate = df['associate_name'].value_counts().idxmax() if not df.empty else '-'
-    best_associate_count = df['associate_name'].value_counts().max() if not df.empty else 0
+    # Every tile is read off the summary's per-value counts; no pass over the rows
+    best_alliance, _ = summary.best('alliance_type')
+    best_bu, _ = summary.best('business_unit')
+    best_geo, _ = summary.best('geo')
+    best_associate, best_associate_count = summary.best('associate_name')
     # Metrics
     col1.metric(label=f"{emoji_icon('🤝')} Best Alliance", value=best_alliance)
     col2.metric(label=f"{emoji_icon('🏢')} Best BU", value=best_bu)
@@ -30,122 +36,205 @@ def render_dashboard_summary(df):
     st.markdown("---")
     # Tiles/Cards for counts
     t1, t2, t3, t4 = st.columns(4)
-    t1.metric(f"🎓 Total Certifications", len(df))
-    t2.metric(f"👥 Unique Associates", df['associate_id'].nunique() if 'associate_id' in df.columns else df['associate_name'].nunique())
-    t3.metric(f"📚 Unique Activities", df['activity_code'].nunique() if 'activity_code' in df.columns else 0)
-    t4.metric(f"🤝 Unique Alliances", df['alliance_type'].nunique())
+    t1.metric(f"🎓 Total Certifications", summary.total)
+    t2.metric(f"👥 Unique Associates", summary.unique('associate_id'))
+    t3.metric(f"📚 Unique Activities", summary.unique('activity_code'))
+    t4.metric(f"🤝 Unique Alliances", summary.unique('alliance_type'))
     st.markdown("---")
     # Monthly Report Dashboard
     st.markdown("### 📅 Monthly Certification Trend")
-    if not df.empty:
-        df['Month'] = pd.to_datetime(df['completion_date']).dt.to_period('M').astype(str)
-        monthly = df.groupby('Month').size().reset_index(name='Certifications')
-        fig = px.bar(monthly, x='Month', y='Certifications', color='Certifications', color_continuous_scale=px.colors.sequential.Blues, title='Monthly Certifications')
-        fig.update_layout(xaxis_title='Month', yaxis_title='Certifications', plot_bgcolor='#f8f9fa', font_family='Open Sans', title_font_size=18)
+    if summary.total:
+        def build():
+            monthly = summary.monthly()
+            fig = px.bar(monthly, x='Month', y='Certifications', color='Certifications', color_continuous_scale=px.colors.sequential.Blues, title='Monthly Certifications')
+            fig.update_layout(xaxis_title='Month', yaxis_title='Certifications', plot_bgcolor='#f8f9fa', font_family='Open Sans', title_font_size=18)
+            return fig
+        # The summary is for the session's filter state, so that is the cache key
+        fig = cached_figure('summary_monthly', build, st.session_state.get('filters'), st.session_state.get('role'), version)
         st.plotly_chart(fig, use_container_width=True)
     st.markdown("---")
     # Summary Details
     st.markdown("### 📊 Summary Details")
-    st.dataframe(df.describe(include='all').T, use_container_width=True)
+    st.dataframe(summary.column_stats(), use_container_width=True)
     st.markdown("---")
     # Rain effect for best associate (remove if streamlit_extras not available)
     # if best_associate != '-' and best_associate_count > 0:
     #     rain(emoji="🎉", font_size=32, falling_speed=5, animation_length="infinite")
 
+# Grid sort options: label -> performance_data column
+GRID_SORT_OPTIONS = {
+    'Record order': 'id',
+    'Completion Date': 'completion_date',
+    'Associate Name': 'associate_name',
+    'Associate ID': 'associate_id',
+    'Activity Code': 'activity_code',
+    'Certification Name': 'certification_name',
+    'Alliance Type': 'alliance_type',
+    'Business Unit': 'business_unit',
+    'Geo': 'geo',
+}
+
+def _reset_grid_page():
+    st.session_state['grid_page'] = 1
+
+@timed('ui.grid')
+def render_performance_grid(total: int):
+    """Show performance_data one page at a time; search, sort and paging run in SQLite."""
+    col_search, col_sort, col_order = st.columns([3, 2, 1])
+    search = col_search.text_input("Search", key='grid_search', on_change=_reset_grid_page,
+                                   placeholder="Associate, activity or certification")
+    sort_label = col_sort.selectbox("Sort by", list(GRID_SORT_OPTIONS), key='grid_sort', on_change=_reset_grid_page)
+    descending = col_order.checkbox("Descending", key='grid_desc', on_change=_reset_grid_page)
+    matching = count_performance_rows(search=search) if search.strip() else total
+    pages = max(1, -(-matching // GRID_PAGE_SIZE))
+    # Keep the stored page valid when a write or a new search shrinks the result
+    if st.session_state.get('grid_page', 1) > pages:
+        st.session_state['grid_page'] = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key='grid_page')
+    page_df = get_performance_page(search=search, sort_by=GRID_SORT_OPTIONS[sort_label], descending=descending,
+                                   page=page - 1, page_size=GRID_PAGE_SIZE)
+    if page_df is None or page_df.empty:
+        st.info("No records match the search.")
+        return
+    first = (page - 1) * GRID_PAGE_SIZE + 1
+    st.caption(f"Rows {first}-{first + len(page_df) - 1} of {matching}")
+    display_cols = list(GRID_COLUMNS)
+    gb = GridOptionsBuilder.from_dataframe(page_df[display_cols])
+    # Sorting and filtering inside the grid would only apply to the current page
+    gb.configure_default_column(editable=False, filter=False, sortable=False, resizable=True)
+    gb.configure_grid_options(domLayout='normal')
+    grid_options = gb.build()
+    with timer('ui.grid.aggrid'):
+        AgGrid(
+            page_df[display_cols],
+            gridOptions=grid_options,
+            update_mode=GridUpdateMode.NO_UPDATE,
+            theme='streamlit',
+            fit_columns_on_grid_load=True,
+            height=400,
+            width='100%'
+        )
+
+def render_import_job(job: dict):
+    title = f"Import #{job['id']} ({job['filename']}, {job['mode']})"
+    if job['status'] in ACTIVE_IMPORT_STATUSES:
+        if job['status'] == 'inserting' and job['rows_total']:
+            done = min(job['rows_processed'] / job['rows_total'], 1.0)
+            st.progress(done, text=f"{title}: loading {job['rows_processed']}/{job['rows_total']} rows...")
+        else:
+            st.progress(0, text=f"{title}: {job['status']}...")
+    elif job['status'] == 'done':
+        st.success(f"{title}: {job['message']}")
+    else:
+        st.error(f"{title}: {job['message']}\n\n{job['errors'] or ''}")
+
+@st.fragment(run_every=IMPORT_POLL_SECONDS)
+def _poll_import_jobs():
+    # Reruns on its own every IMPORT_POLL_SECONDS while a job is running, without
+    # rerunning the rest of the page
+    jobs = list_import_jobs()
+    for job in jobs:
+        render_import_job(job)
+    watched = st.session_state.setdefault('watched_import_jobs', set())
+    finished = {job['id'] for job in jobs if job['status'] not in ACTIVE_IMPORT_STATUSES}
+    if watched & finished or not any(job['status'] in ACTIVE_IMPORT_STATUSES for job in jobs):
+        # Redraw the whole page so the grid and summary show the loaded data
+        watched -= finished
+        st.rerun()
+
+def render_import_jobs():
+    """Recent import jobs; polled while one is queued or running."""
+    jobs = list_import_jobs()
+    if not jobs:
+        return
+    st.subheader("Imports")
+    if any(job['status'] in ACTIVE_IMPORT_STATUSES for job in jobs):
+        _poll_import_jobs()
+    else:
+        for job in jobs:
+            render_import_job(job)
+
+def render_backup_restore():
+    """Reload the last load from its columnar snapshot, or an earlier upload from the backup catalog."""
+    backups = {b['sha256']: b for b in list_backups()}
+    snapshot = get_snapshot_info()
+    if not backups and not snapshot:
+        return
+    with st.expander("Restore from backup"):
+        if snapshot:
+            st.caption(f"Snapshot of the last load: {snapshot.get('filename')}, {snapshot['rows']} records, "
+                       f"written {snapshot['written_at']}. Restoring it skips parsing the workbook.")
+            if st.button("Restore last load", key='restore_snapshot_btn'):
+                job_id = submit_snapshot_restore(st.session_state.get('username'))
+                st.session_state.setdefault('watched_import_jobs', set()).add(job_id)
+                st.toast(f"Import #{job_id} queued from the snapshot.")
+        if not backups:
+            return
+        def label(sha256):
+            b = backups[sha256]
+            return f"{b['filename']} (last uploaded {b['last_uploaded_at']} by {b['uploaded_by'] or 'unknown'}, {b['size'] / 1024:.0f} KB)"
+        sha256 = st.selectbox("Backup", list(backups), format_func=label, key='restore_backup')
+        if st.button("Restore", key='restore_backup_btn'):
+            data = read_backup(sha256)
+            if data is None:
+                st.error("This backup is no longer stored.")
+            else:
+                job_id = submit_import(data, backups[sha256]['filename'], 'replace',
+                                       st.session_state.get('username'))
+                st.session_state.setdefault('watched_import_jobs', set()).add(job_id)
+                st.toast(f"Import #{job_id} queued from the backup.")
+
+def render_report_pack_status():
+    """When the report pack served to guests was built, and a button to rebuild it now."""
+    from utils.report_pack import get_report_pack
+    pack = get_report_pack()
+    with st.expander("Report pack"):
+        if pack:
+            st.caption(f"Generated {pack['generated_at']} ({pack['trigger']}) from {pack['records']} records. "
+                       "It is rebuilt after every load; run `python main.py --build-report-pack` on a schedule "
+                       "to refresh it after record edits.")
+        else:
+            st.caption("No report pack has been generated yet.")
+        if st.button("Rebuild report pack", key='report_pack_rebuild'):
+            submit_report_pack('manual')
+            st.toast("Report pack rebuild queued.")
+
 def data_management_ui():
     # Always show upload option, even if no data
     st.header("Data Management")
-    uploaded_file = st.file_uploader("Upload Performance Excel", type=["xlsx"])
-    data_loaded = False
-    upload_progress = st.empty()
+    if 'load_result' in st.session_state:
+        st.success(st.session_state.pop('load_result'))
+    uploaded_file = st.file_uploader(
+        "Upload Performance Excel", type=["xlsx"],
+        help="The first sheet holds the performance data. Global, BU Wise Report, Alliance Wise Report and "
+             "Cost Savings sheets in the same workbook are loaded too, all in one step."
+    )
     if uploaded_file:
-        if 'file_uploaded_shown' not in st.session_state:
-            with upload_progress:
-                st.progress(100, text="File uploaded!")
-            st.session_state['file_uploaded_shown'] = True
-        df, errors = parse_performance_data(uploaded_file)
-        upload_progress.empty()  # Hide upload progress bar after parsing
-        if errors:
-            st.error("\n".join(errors))
+        # Parsing, validation and loading run in a background job (utils/import_runner.py);
+        # very large workbooks are validated and inserted chunk by chunk
+        streaming = uploaded_file.size > STREAMING_UPLOAD_THRESHOLD_BYTES
+        if streaming:
+            st.info("Large file: rows will be validated in chunks while loading, replacing all records.")
+            load_mode = "Replace all records"
         else:
-            load_progress = st.empty()
-            if st.button("Load Performance Data"):
-                from db.database_operations import get_sqlite_connection
-                import os
-                import datetime
-                # Save uploaded file as backup with timestamp
-                backup_dir = os.path.join(os.getcwd(), 'uploaded_backups')
-                os.makedirs(backup_dir, exist_ok=True)
-                timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-                backup_path = os.path.join(backup_dir, f'performance_backup_{timestamp}.xlsx')
-                with open(backup_path, 'wb') as f:
-                    f.write(uploaded_file.getbuffer())
-                conn = get_sqlite_connection()
-                if conn:
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM performance_data")
-                    conn.commit()
-                    cursor.close()
-                    import time
-                    time.sleep(0.2)
-                    conn.close()
-                total = len(df)
-                to_insert = []
-                for i, (_, row) in enumerate(df.iterrows()):
-                    from db.database_operations import clean_date
-                    raw_date = str(row.get('Completion Date', ''))
-                    if ' ' in raw_date:
-                        raw_date = raw_date.split(' ')[0]
-                    if 'T' in raw_date:
-                        raw_date = raw_date.split('T')[0]
-                    date_val = clean_date(raw_date)
-                    data = {
-                        'associate_id': str(row.get('Associate ID', '') or '').strip(),
-                        'associate_name': str(row.get('Associate Name', '') or '').strip(),
-                        'activity_code': str(row.get('Activity Code', '') or '').strip(),
-                        'alliance_type': str(row.get('Alliance Type', '') or '').strip(),
-                        'business_unit': str(row.get('BU', '') or '').strip(),
-                        'geo': str(row.get('Geo', '') or '').strip(),
-                        'certification_name': str(row.get('Activity Name', '') or '').strip(),
-                        'completion_date': date_val if date_val else '',
-                        'feedback': None
-                    }
-                    required = ['associate_id','associate_name','activity_code','alliance_type','business_unit','geo','certification_name','completion_date']
-                    if all(data[k] for k in required):
-                        to_insert.append(data)
-                    load_progress.progress(int((i+1)/total*100), text=f"Preparing data... ({i+1}/{total})")
-                load_progress.progress(100, text="Inserting data into database...")
-                if to_insert:
-                    from db.database_operations import get_sqlite_connection
-                    conn = get_sqlite_connection()
-                    if conn:
-                        cursor = conn.cursor()
-                        cursor.executemany(
-                            """
-                            INSERT INTO performance_data (associate_id, associate_name, activity_code, alliance_type, business_unit, geo, certification_name, completion_date, feedback)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """,
-                            [(
-                                d['associate_id'], d['associate_name'], d['activity_code'], d['alliance_type'], d['business_unit'],
-                                d['geo'], d['certification_name'], d['completion_date'], d.get('feedback', None)
-                            ) for d in to_insert]
-                        )
-                        conn.commit()
-                        cursor.close()
-                        conn.close()
-                load_progress.empty()
-                st.success("Performance data loaded and old data cleared.")
-                st.session_state['file_uploader_clear'] = True  # Custom flag to clear uploader
-                st.session_state['performance_data_loaded'] = False  # Reset so uploader is always visible
-                st.rerun()
-        data_loaded = True
-    else:
-        st.session_state.pop('file_uploaded_shown', None)
+            load_mode = st.radio(
+                "Load mode",
+                ["Incremental (apply changes only)", "Replace all records"],
+                horizontal=True,
+                help="Incremental mode only inserts, updates or deletes the rows that differ from the current data."
+            )
+        if st.button("Load Performance Data"):
+            job_id = submit_import(uploaded_file.getvalue(), uploaded_file.name,
+                                   'sync' if load_mode.startswith("Incremental") else 'replace',
+                                   st.session_state.get('username'))
+            st.session_state.setdefault('watched_import_jobs', set()).add(job_id)
+            st.toast(f"Import #{job_id} queued. You can keep using the dashboard while it loads.")
+    render_backup_restore()
+    render_import_jobs()
     # CRUD Table and Reports only if data exists
-    from db.database_operations import get_all_performance_data, get_sqlite_connection
-    df_perf = get_all_performance_data()
+    total_records = count_performance_rows()
     # Add Delete All button with confirmation
-    if df_perf is not None and not df_perf.empty:
+    if total_records:
         if st.button('Delete All Records', key='delete_all_btn'):
             st.session_state['show_delete_all_confirm'] = True
         if st.session_state.get('show_delete_all_confirm', False):
@@ -153,43 +242,22 @@ def data_management_ui():
             col_del1, col_del2 = st.columns(2)
             with col_del1:
                 if st.button('Confirm Delete All', key='confirm_delete_all'):
-                    conn = get_sqlite_connection()
-                    if conn:
-                        cursor = conn.cursor()
-                        cursor.execute('DELETE FROM performance_data')
-                        conn.commit()
-                        cursor.close()
-                        conn.close()
-                    st.success('All performance records deleted.')
+                    success, msg = delete_all_performance_data()
                     st.session_state['show_delete_all_confirm'] = False
-                    st.rerun()
+                    if success:
+                        st.session_state['load_result'] = msg
+                        st.rerun()
+                    else:
+                        st.error(msg)
             with col_del2:
                 if st.button('Cancel', key='cancel_delete_all'):
                     st.session_state['show_delete_all_confirm'] = False
     else:
         st.info("No data available. Please upload an Excel file to populate the dashboard.")
-    # Show Performance Data Table with associate_id and actions, with search, sort, pagination, and filter
-    if df_perf is not None and not df_perf.empty:
-        display_cols = [col for col in df_perf.columns if col in [
-            'associate_id', 'associate_name', 'activity_code', 'certification_name', 'completion_date', 'alliance_type', 'business_unit', 'geo']]
-        gb = GridOptionsBuilder.from_dataframe(df_perf[display_cols])
-        gb.configure_pagination(paginationAutoPageSize=True)
-        gb.configure_default_column(editable=False, groupable=True, filter=True, sortable=True, resizable=True)
-        gb.configure_side_bar()
-        gb.configure_grid_options(domLayout='normal')
-        grid_options = gb.build()
-        grid_response = AgGrid(
-            df_perf[display_cols],
-            gridOptions=grid_options,
-            update_mode=GridUpdateMode.NO_UPDATE,
-            enable_enterprise_modules=True,
-            allow_unsafe_jscode=True,
-            theme='streamlit',
-            fit_columns_on_grid_load=True,
-            height=400,
-            width='100%'
-        )
-    # Add this at the end of the function to clear the uploader if needed
-    if 'file_uploader_clear' in st.session_state and st.session_state['file_uploader_clear']:
-        st.session_state['file_uploader_clear'] = False
-        st.rerun()
+    # Show Performance Data Table with associate_id, with search, sort and pagination
+    if total_records:
+        render_performance_grid(total_records)
+        with st.expander("Export"):
+            st.caption("Exports the records matching the sidebar filters.")
+            export_dataframe(st.session_state.get('filters'))
+        render_report_pack_status()
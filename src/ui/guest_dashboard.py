@@ -1,37 +1,47 @@
 import streamlit as st
 import pandas as pd
-from db.database_operations import get_sqlite_connection
+from ui.navigation import render_lazy_tabs
 
 # Guest dashboard UI components
+def render_overview():
+    st.header("Key Performance Highlights (Read-Only)")
+    from ui.reports import certifications_by_alliance_chart, certifications_by_bu_chart, certifications_by_geo_chart, monthly_trend_chart
+    certifications_by_alliance_chart()
+    certifications_by_bu_chart()
+    certifications_by_geo_chart()
+    monthly_trend_chart()
+
+# The report tabs serve the pre-rendered report pack instead of computing the reports
+def render_bu_report():
+    st.header("BU Wise Report (Read-Only)")
+    from ui.reports import render_report_pack
+    render_report_pack('bu_wise')
+
+def render_alliance_report():
+    st.header("Alliance Wise Report (Read-Only)")
+    from ui.reports import render_report_pack
+    render_report_pack('alliance_wise')
+
+def render_cost_savings():
+    st.header("Cost Savings (Read-Only)")
+    from ui.reports import render_report_pack
+    render_report_pack('cost_savings')
+
 def guest_dashboard():
-    from db.database_operations import get_all_performance_data
-    df_perf = get_all_performance_data()
-    if df_perf is None or df_perf.empty:
+    from db.database_operations import count_performance_rows
+    # The charts read the rollup, so the raw rows are not loaded just to check for data
+    if not count_performance_rows():
         st.info("No data available. Please contact an admin to upload an Excel file in the Data Management tab.")
         return
 
     st.info(f"Welcome, Guest!")
-    tabs = st.tabs(["Dashboard Overview", "BU Wise Report", "Alliance Wise Report", "Cost Savings"])
-    # Dashboard Overview
-    with tabs[0]:
-        st.header("Key Performance Highlights (Read-Only)")
-        from ui.reports import certifications_by_alliance_chart, certifications_by_bu_chart, certifications_by_geo_chart, monthly_trend_chart
-        certifications_by_alliance_chart()
-        certifications_by_bu_chart()
-        certifications_by_geo_chart()
-        monthly_trend_chart()
-    # BU Wise Report
-    with tabs[1]:
-        st.header("BU Wise Report (Read-Only)")
-        st.write("[BU metrics table and charts]")
-    # Alliance Wise Report
-    with tabs[2]:
-        st.header("Alliance Wise Report (Read-Only)")
-        st.write("[Alliance metrics table and charts]")
-    # Cost Savings
-    with tabs[3]:
-        st.header("Cost Savings (Read-Only)")
-        st.write("[Cost savings table and charts]")
+    # Only the selected tab is rendered
+    render_lazy_tabs({
+        "Dashboard Overview": render_overview,
+        "BU Wise Report": render_bu_report,
+        "Alliance Wise Report": render_alliance_report,
+        "Cost Savings": render_cost_savings,
+    }, key='guest_view')
     if st.button("Logout", key="guest_logout"):
         st.session_state['logged_in'] = False
         st.session_state['role'] = None
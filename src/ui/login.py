@@ -1,5 +1,5 @@
 import streamlit as st
-from auth.auth_utils import authenticate_admin
+from auth.auth_utils import login_admin
 
 # Login UI components
 
@@ -10,14 +10,15 @@ def login_page():
         username = st.text_input("Username", key="admin_username")
         password = st.text_input("Password", type="password", key="admin_password")
         if st.button("Login", key="admin_login_btn"):
-            if authenticate_admin(username, password):
+            success, msg = login_admin(username, password)
+            if success:
                 st.session_state['logged_in'] = True
                 st.session_state['role'] = 'admin'
                 st.session_state['username'] = username
                 st.success("Login successful! Redirecting to admin dashboard...")
                 st.rerun()
             else:
-                st.error("Invalid username or password")
+                st.error(msg)
     with tab2:
         if st.button("Login as Guest", key="guest_login_btn"):
             st.session_state['logged_in'] = True
@@ -0,0 +1,47 @@
+# Lazy tab bar for the dashboards
+#
+# st.tabs runs the body of every tab on every rerun and only hides the inactive
+# ones in the browser. render_lazy_tabs draws an equivalent tab bar and runs only
+# the selected view; the others cost nothing until they are opened, and the data
+# they show stays in the process-wide caches in the meantime.
+
+import threading
+import time
+import streamlit as st
+from utils.instrumentation import timer
+
+# (tab bar key, view label) -> {'runs', 'last', 'total'} render seconds, all sessions
+_view_timings = {}
+_timings_lock = threading.Lock()
+
+def render_lazy_tabs(views: dict, key: str):
+    """Show a tab bar over ``views`` (label -> zero-argument render function) and run the active one.
+
+    The selection survives reruns under ``key`` in session state. Returns the active label.
+    """
+    active = st.radio("View", list(views), key=key, horizontal=True, label_visibility='collapsed')
+    start = time.perf_counter()
+    try:
+        with timer(f'view.{active}'):
+            views[active]()
+    finally:
+        elapsed = time.perf_counter() - start
+        with _timings_lock:
+            timing = _view_timings.setdefault((key, active), {'runs': 0, 'last': 0.0, 'total': 0.0})
+            timing['runs'] += 1
+            timing['last'] = elapsed
+            timing['total'] += elapsed
+    return active
+
+def get_view_timings(key: str) -> dict:
+    """Render timings per view label of one tab bar: runs, last and total seconds."""
+    with _timings_lock:
+        return {label: dict(timing) for (bar, label), timing in _view_timings.items() if bar == key}
+
+def estimate_rerun_savings(key: str, active: str) -> float:
+    """Seconds an eager st.tabs rerun would spend on the views other than ``active``.
+
+    Based on each view's last measured render time; views never opened count as 0.
+    """
+    timings = get_view_timings(key)
+    return sum(timing['last'] for label, timing in timings.items() if label != active)
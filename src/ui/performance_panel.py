@@ -0,0 +1,58 @@
+# Admin-only Performance panel: where the time of a rerun goes
+#
+# Reads the measurements collected by utils/instrumentation.py. The breakdown is
+# that of the session's previous rerun (the current one is still running while
+# the panel is drawn); the percentiles cover recent calls from every session.
+
+import streamlit as st
+import pandas as pd
+
+def render_last_rerun(profile: dict):
+    st.subheader("Last Rerun")
+    if not profile:
+        st.info("No rerun has been profiled yet in this session.")
+        return
+    st.metric("Total", f"{profile['total_ms']:.1f} ms")
+    timings = pd.DataFrame(
+        [{'Timer': name, 'Calls': t['calls'], 'ms': t['ms'],
+          '% of rerun': round(100 * t['ms'] / profile['total_ms'], 1) if profile['total_ms'] else 0.0}
+         for name, t in profile['timings'].items()],
+        columns=['Timer', 'Calls', 'ms', '% of rerun'])
+    # Timers nest (a view includes the DB calls and charts it makes), so the
+    # percentages do not add up to 100
+    st.dataframe(timings.sort_values('ms', ascending=False), use_container_width=True, hide_index=True)
+    if profile['counters']:
+        st.caption(", ".join(f"{name}: {n}" for name, n in sorted(profile['counters'].items())))
+
+def performance_panel_ui():
+    from utils.instrumentation import get_timer_stats, get_counters, log_metrics_summary, reset_metrics
+    from utils.figure_cache import get_figure_cache_stats
+    from db.connection_pool import get_pool_stats
+    st.header("Performance")
+    render_last_rerun(st.session_state.get('last_rerun_profile'))
+
+    st.subheader("Percentiles (all sessions)")
+    stats = get_timer_stats()
+    if stats:
+        st.dataframe(pd.DataFrame(stats).sort_values('p95_ms', ascending=False), use_container_width=True, hide_index=True)
+    else:
+        st.info("Nothing measured yet.")
+    counters = get_counters()
+    if counters:
+        st.dataframe(pd.DataFrame(sorted(counters.items()), columns=['Counter', 'Count']), use_container_width=True, hide_index=True)
+
+    col_pool, col_figures = st.columns(2)
+    with col_pool:
+        st.subheader("Connection Pool")
+        st.json(get_pool_stats())
+    with col_figures:
+        st.subheader("Figure Cache")
+        st.json(get_figure_cache_stats())
+
+    col_log, col_reset = st.columns(2)
+    if col_log.button("Write summary to log", key="metrics_log"):
+        log_metrics_summary()
+        st.success("Metrics summary written to the application log.")
+    if col_reset.button("Reset measurements", key="metrics_reset"):
+        reset_metrics()
+        st.rerun()
@@ -1,72 +1,104 @@
 # Reports UI components
 
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from db.database_operations import get_all_performance_data
+from db.database_operations import get_performance_rollup, rollup_counts, get_data_version
+from utils.figure_cache import cached_figure
 
-def apply_filters(df):
-    filters = st.session_state.get('filters', {})
-    if not filters or df is None:
-        return df
-    if filters.get('alliance_type') and filters['alliance_type'] != 'All':
-        df = df[df['alliance_type'] == filters['alliance_type']]
-    if filters.get('business_unit') and filters['business_unit'] != 'All':
-        df = df[df['business_unit'] == filters['business_unit']]
-    if filters.get('geo') and filters['geo'] != 'All':
-        df = df[df['geo'] == filters['geo']]
-    if filters.get('date_range') and len(filters['date_range']) == 2:
-        start, end = filters['date_range']
-        df = df[(pd.to_datetime(df['completion_date']) >= pd.to_datetime(start)) & (pd.to_datetime(df['completion_date']) <= pd.to_datetime(end))]
-    return df
+def _report_rollup():
+    # The session's rollup and the data version read before fetching it
+    version = get_data_version()
+    return version, get_performance_rollup(st.session_state.get('filters'))
+
+def _cached_report_figure(chart_id, build, version):
+    # Figures are shared across sessions per (chart, filters, data version, role)
+    return cached_figure(chart_id, build, st.session_state.get('filters'), st.session_state.get('role'), version)
 
 def certifications_by_alliance_chart():
-    df = get_all_performance_data()
-    df = apply_filters(df)
-    if df is not None and not df.empty:
-        chart = px.bar(df, x='alliance_type', title='Certifications by Alliance Type')
+    version, rollup = _report_rollup()
+    if rollup is not None and not rollup.empty:
+        chart = _cached_report_figure('report_cert_by_alliance', lambda: px.bar(
+            rollup_counts(rollup, 'alliance_type'), x='alliance_type', y='Certifications', title='Certifications by Alliance Type'), version)
         st.plotly_chart(chart, use_container_width=True)
 
 def certifications_by_bu_chart():
-    df = get_all_performance_data()
-    df = apply_filters(df)
-    if df is not None and not df.empty:
-        chart = px.bar(df, x='business_unit', title='Certifications by Business Unit')
+    version, rollup = _report_rollup()
+    if rollup is not None and not rollup.empty:
+        chart = _cached_report_figure('report_cert_by_bu', lambda: px.bar(
+            rollup_counts(rollup, 'business_unit'), x='business_unit', y='Certifications', title='Certifications by Business Unit'), version)
         st.plotly_chart(chart, use_container_width=True)
 
 def certifications_by_geo_chart():
-    df = get_all_performance_data()
-    df = apply_filters(df)
-    if df is not None and not df.empty:
-        chart = px.pie(df, names='geo', title='Certifications by Geographical Region')
+    version, rollup = _report_rollup()
+    if rollup is not None and not rollup.empty:
+        chart = _cached_report_figure('report_cert_by_geo', lambda: px.pie(
+            rollup_counts(rollup, 'geo'), names='geo', values='Certifications', title='Certifications by Geographical Region'), version)
         st.plotly_chart(chart, use_container_width=True)
 
 def monthly_trend_chart():
-    df = get_all_performance_data()
-    if df is None or df.empty:
+    version, rollup = _report_rollup()
+    if rollup is None or rollup.empty:
         st.info("No data available. Please upload an Excel file to view the monthly trend chart.")
         return
-    df = apply_filters(df)
-    if df is not None and not df.empty:
-        df['month'] = pd.to_datetime(df['completion_date']).dt.to_period('M').astype(str)
-        chart = px.line(df.groupby('month').size().reset_index(name='count'), x='month', y='count', markers=True, title='Monthly Certification Completion Trend')
-        st.plotly_chart(chart, use_container_width=True)
+    def build():
+        monthly = rollup_counts(rollup, 'month').rename(columns={'Certifications': 'count'})
+        return px.line(monthly, x='month', y='count', markers=True, title='Monthly Certification Completion Trend')
+    st.plotly_chart(_cached_report_figure('report_monthly_trend', build, version), use_container_width=True)
+
+# Download formats: format -> (label, MIME type)
+EXPORT_DOWNLOADS = {
+    'csv': ("CSV", 'text/csv'),
+    'xlsx': ("Excel", 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+def _clear_prepared_export(key: str):
+    st.session_state.pop(key, None)
 
-def export_dataframe(df, filename_prefix):
-    import io
-    st.download_button(
-        label="Export to CSV",
-        data=df.to_csv(index=False).encode('utf-8'),
-        file_name=f"{filename_prefix}.csv",
-        mime='text/csv'
-    )
-    # Fix: Use an in-memory BytesIO buffer for Excel export
-    excel_buffer = io.BytesIO()
-    df.to_excel(excel_buffer, index=False, engine='xlsxwriter')
-    excel_buffer.seek(0)
-    st.download_button(
-        label="Export to Excel",
-        data=excel_buffer,
-        file_name=f"{filename_prefix}.xlsx",
-        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+def export_dataframe(filters: dict = None, filename_prefix: str = 'performance_data'):
+    """CSV and Excel downloads of the performance data matching ``filters``.
+
+    Nothing is generated until the user asks for a format; the file is then
+    streamed from SQLite to disk (utils/export_cache.py) and shared by every
+    session until the data changes.
+    """
+    from utils.export_cache import find_export, export_performance_data
+    columns = st.columns(len(EXPORT_DOWNLOADS))
+    for col, (fmt, (label, mime)) in zip(columns, EXPORT_DOWNLOADS.items()):
+        # Path of the export this session prepared; the download button reads the
+        # whole file, so it is only shown from "Prepare" until the download
+        prepared_key = f'export_prepared_{fmt}'
+        with col:
+            if st.button(f"Prepare {label} export", key=f'export_prepare_{fmt}'):
+                with st.spinner(f"Writing {label} export..."):
+                    st.session_state[prepared_key] = export_performance_data(filters, fmt)
+            path = st.session_state.get(prepared_key)
+            if path is not None and path != find_export(filters, fmt):
+                # The data or the filters changed since it was prepared
+                _clear_prepared_export(prepared_key)
+                path = None
+            if path is not None:
+                with open(path, 'rb') as f:
+                    st.download_button(label=f"Export to {label}", data=f, file_name=f"{filename_prefix}.{fmt}",
+                                       mime=mime, key=f'export_download_{fmt}',
+                                       on_click=_clear_prepared_export, args=(prepared_key,))
+
+def render_report_pack(report: str):
+    """Show one report of the pre-rendered pack (utils/report_pack.py): chart, tables and workbook download."""
+    from utils.report_pack import get_report_pack, get_report_pack_figure, get_report_pack_table
+    import os
+    pack = get_report_pack()
+    if pack is None:
+        st.info("The report pack has not been generated yet. It is built after every data load.")
+        return
+    entry = pack['reports'][report]
+    st.caption(f"Pre-rendered {pack['generated_at']} from {pack['records']} records.")
+    if entry['chart']:
+        figure = get_report_pack_figure(entry['chart'])
+        if figure is not None:
+            st.plotly_chart(figure, use_container_width=True, key=f'pack_{report}_chart')
+    for sheet in entry['tables']:
+        st.subheader(sheet)
+        st.dataframe(get_report_pack_table(pack, report, sheet), use_container_width=True, hide_index=True)
+    with open(os.path.join(pack['dir'], entry['workbook']), 'rb') as f:
+        st.download_button(label="Download Excel report", data=f, file_name=entry['workbook'],
+                           mime=EXPORT_DOWNLOADS['xlsx'][1], key=f'pack_{report}_download')
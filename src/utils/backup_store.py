@@ -0,0 +1,127 @@
+# Content-addressed, compressed store of uploaded workbooks
+#
+# Each upload is stored once under BACKUP_DIR as <sha256[:2]>/<sha256>.xlsx.gz;
+# uploading the same bytes again only updates its catalog entry. The catalog
+# (upload_backups table) records the original file name, sizes and upload times,
+# so listing and restoring never scan the directory. The retention policy runs
+# after every new backup.
+
+import gzip
+import hashlib
+import logging
+import os
+import uuid
+from config import BACKUP_DIR, BACKUP_KEEP_LATEST, BACKUP_MAX_AGE_DAYS
+from db.connection_pool import pooled_connection, writer_connection
+
+# Workbooks are zip files already, so gzip typically saves only 2-10%; higher
+# levels cost time on large uploads for little more
+BACKUP_COMPRESSION_LEVEL = 6
+
+def create_backup_catalog():
+    """Schema migration step: the upload_backups catalog table."""
+    with writer_connection() as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS upload_backups (
+            sha256 TEXT PRIMARY KEY,
+            filename TEXT,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            compression TEXT NOT NULL,
+            upload_count INTEGER NOT NULL DEFAULT 1,
+            uploaded_by TEXT,
+            first_uploaded_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            last_uploaded_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_backups_last_uploaded ON upload_backups (last_uploaded_at)")
+        conn.commit()
+
+def _absolute(path: str) -> str:
+    # Catalog paths are relative to BACKUP_DIR, so the directory can be moved
+    return os.path.join(BACKUP_DIR, path)
+
+def store_backup(data: bytes, filename: str = None, uploaded_by: str = None) -> dict:
+    """Store an uploaded workbook unless identical bytes are already stored.
+
+    Returns the catalog entry as a dict, with 'new' False for a repeat upload.
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = os.path.join(sha256[:2], f'{sha256}.xlsx.gz')
+    with pooled_connection() as conn:
+        known = conn.execute("SELECT 1 FROM upload_backups WHERE sha256 = ?", (sha256,)).fetchone()
+    new = not (known and os.path.exists(_absolute(path)))
+    if new:
+        # Written and renamed outside the write lock; same hash means same bytes,
+        # so two concurrent uploads of one file cannot conflict
+        compressed = gzip.compress(data, compresslevel=BACKUP_COMPRESSION_LEVEL)
+        os.makedirs(os.path.dirname(_absolute(path)), exist_ok=True)
+        temp = _absolute(path) + f'.{uuid.uuid4().hex}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(compressed)
+        os.replace(temp, _absolute(path))
+    with writer_connection() as conn:
+        conn.execute('''
+            INSERT INTO upload_backups (sha256, filename, path, size, stored_size, compression, uploaded_by)
+            VALUES (?, ?, ?, ?, ?, 'gzip', ?)
+            ON CONFLICT (sha256) DO UPDATE SET
+                upload_count = upload_count + 1, last_uploaded_at = CURRENT_TIMESTAMP,
+                filename = excluded.filename, uploaded_by = excluded.uploaded_by''',
+            (sha256, filename, path, len(data), os.path.getsize(_absolute(path)), uploaded_by))
+        conn.commit()
+    if new:
+        apply_backup_retention()
+    entry = get_backup(sha256)
+    entry['new'] = new
+    return entry
+
+def get_backup(sha256: str) -> dict:
+    with pooled_connection() as conn:
+        cursor = conn.execute("SELECT * FROM upload_backups WHERE sha256 = ?", (sha256,))
+        row = cursor.fetchone()
+        return dict(zip([c[0] for c in cursor.description], row)) if row else None
+
+def list_backups(limit: int = BACKUP_KEEP_LATEST) -> list:
+    """Catalog entries, most recently uploaded first."""
+    with pooled_connection() as conn:
+        cursor = conn.execute("SELECT * FROM upload_backups ORDER BY last_uploaded_at DESC, rowid DESC LIMIT ?", (int(limit),))
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def read_backup(sha256: str) -> bytes:
+    """The original bytes of a stored upload, or None if it is not (or no longer) stored."""
+    entry = get_backup(sha256)
+    if entry is None or not os.path.exists(_absolute(entry['path'])):
+        return None
+    with open(_absolute(entry['path']), 'rb') as f:
+        data = f.read()
+    return gzip.decompress(data) if entry['compression'] == 'gzip' else data
+
+def apply_backup_retention() -> int:
+    """Delete backups beyond BACKUP_KEEP_LATEST or older than BACKUP_MAX_AGE_DAYS; returns how many.
+
+    The most recently uploaded backup is always kept.
+    """
+    with writer_connection() as conn:
+        expired = [row[0] for row in conn.execute('''
+            SELECT sha256, path FROM upload_backups
+            ORDER BY last_uploaded_at DESC, rowid DESC LIMIT -1 OFFSET ?''', (BACKUP_KEEP_LATEST,))]
+        expired += [row[0] for row in conn.execute('''
+            SELECT sha256 FROM upload_backups
+            WHERE last_uploaded_at < datetime('now', ?)
+              AND sha256 != (SELECT sha256 FROM upload_backups ORDER BY last_uploaded_at DESC, rowid DESC LIMIT 1)''',
+            (f'-{int(BACKUP_MAX_AGE_DAYS)} days',))]
+        expired = list(dict.fromkeys(expired))
+        if not expired:
+            return 0
+        paths = [row[0] for row in conn.execute(
+            f"SELECT path FROM upload_backups WHERE sha256 IN ({', '.join('?' * len(expired))})", expired)]
+        conn.executemany("DELETE FROM upload_backups WHERE sha256 = ?", [(sha256,) for sha256 in expired])
+        conn.commit()
+    # Files go after the catalog rows, so a listed backup always has its file
+    for path in paths:
+        try:
+            os.remove(_absolute(path))
+        except OSError as e:
+            logging.warning(f'Could not remove expired backup {path}: {e}')
+    logging.info(f'Backup retention removed {len(expired)} backup(s).')
+    return len(expired)
@@ -1,36 +1,385 @@
 # Excel parsing utilities for data ingestion
 
+import logging
+import os
+import threading
+import warnings
+import numpy as np
 import pandas as pd
-from db.database_operations import clean_date, clean_number
+from config import WORKBOOK_PARSE_PROCESSES
+from utils.instrumentation import timed, timer
 
-def parse_performance_data(sheet) -> (pd.DataFrame, list):
-    """Parse and validate the 'Global Strategic Alliances Partner Performance Dashboard as of May 2025 [Sample data]' sheet."""
-    errors = []
-    df = pd.read_excel(sheet, sheet_name=0)
-    # Standardize columns
-    expected_cols = [
-        'Associate Name', 'Alliance Type', 'Business Unit', 'Geo', 'Certification Name', 'Completion Date', 'Feedback'
-    ]
-    df = df.rename(columns={c: c.strip() for c in df.columns})
-    for col in expected_cols:
-        if col not in df.columns:
-            errors.append(f"Missing column: {col}")
-    # Clean and validate data
-    for idx, row in df.iterrows():
-        date_val = clean_date(row['Completion Date'])
-        if not date_val:
-            errors.append(f"Row {idx+2}: Invalid date format in 'Completion Date'")
-        df.at[idx, 'Completion Date'] = date_val
-    return df, errors
-
-def parse_global_metrics(sheet) -> (pd.DataFrame, list):
+# performance_data column -> accepted sheet headers. The BU and certification
+# columns appear under both names in partner exports.
+PERFORMANCE_COLUMNS = {
+    'associate_id': ('Associate ID',),
+    'associate_name': ('Associate Name',),
+    'activity_code': ('Activity Code',),
+    'alliance_type': ('Alliance Type',),
+    'business_unit': ('BU', 'Business Unit'),
+    'geo': ('Geo',),
+    'certification_name': ('Activity Name', 'Certification Name'),
+    'completion_date': ('Completion Date',),
+}
+# The global metrics sheet and its per-geo value columns, next to 'Total'
+GLOBAL_SHEET = 'Global'
+GLOBAL_GEOS = ('India', 'NA', 'GGM')
+# Report sheets loaded one record per row: table -> (sheet name,
+# {table column: accepted headers}, numeric columns, required columns). The
+# first column of each spec identifies the record; rows without it are ignored.
+METRICS_SHEETS = {
+    'bu_metrics': ('BU Wise Report', {
+        'business_unit': ('BU', 'Business Unit'),
+        'target': ('Target',),
+        'completed': ('Completed',),
+        'achievement_percent': ('Achievement %', 'Achievement Percentage', 'Achievement'),
+    }, ('target', 'completed', 'achievement_percent'), ('target', 'completed')),
+    'alliance_metrics': ('Alliance Wise Report', {
+        'partner_name': ('Partner Name', 'Partner', 'Alliance Partner', 'Alliance'),
+        'business_unit': ('BU', 'Business Unit'),
+        'target': ('Target',),
+        'completed': ('Completed',),
+    }, ('target', 'completed'), ()),
+    'cost_savings': ('Cost Savings', {
+        'partner_name': ('Partner Name', 'Partner', 'Alliance Partner', 'Alliance'),
+        'enablement_saving': ('Enablement Saving', 'Enablement Savings', 'Enablement'),
+        'certification_saving': ('Certification Saving', 'Certification Savings', 'Certification'),
+        'total': ('Total',),
+    }, ('enablement_saving', 'certification_saving', 'total'), ()),
+}
+# Every mapped column must be non-empty for a row to be loaded
+REQUIRED_PERFORMANCE_FIELDS = tuple(PERFORMANCE_COLUMNS)
+# Row numbers listed per error message before the rest are summarised
+MAX_ROWS_PER_ERROR = 20
+# Rows read, cleaned and inserted at a time by the streaming reader
+STREAM_CHUNK_ROWS = 5000
+
+# Cell value types read as numbers (openpyxl yields int and float; pandas may box numpy scalars)
+_NUMBER_TYPES = (int, float, np.int64, np.float64, np.int32, np.float32)
+
+def clean_date_column(values: pd.Series) -> pd.Series:
+    """Vectorized clean_date: 'YYYY-MM-DD' strings, None where a value is not a date.
+
+    Numeric cells are read as YYYYMMDD (20240105 -> 2024-01-05), as clean_date
+    did; any other number, e.g. an unformatted Excel serial, is not a date.
+    """
+    # pd.to_datetime would read numbers as nanoseconds since 1970, so they are
+    # masked out of the date parse and converted separately
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numeric = values.notna()
+    else:
+        # An exact type check: bool and datetime are not numbers here
+        numeric = values.map(type).isin(_NUMBER_TYPES) & values.notna()
+    has_numbers = numeric.any()
+    other = values.astype(object).where(~numeric) if has_numbers else values
+    with warnings.catch_warnings():
+        # Mixed-format columns make pandas warn that it falls back to per-element parsing
+        warnings.simplefilter('ignore', UserWarning)
+        parsed = pd.to_datetime(other, errors='coerce')
+        # The inferred format misses cells written in a different style; only those
+        # (usually a small minority) go through the slower mixed-format parser
+        retry = parsed.isna() & (other.astype(str).str.strip() != '') & other.notna()
+        if retry.any():
+            parsed[retry] = pd.to_datetime(other[retry].astype(str), errors='coerce', format='mixed')
+    if has_numbers:
+        number = pd.to_numeric(values[numeric], errors='coerce')
+        integral = number[number == number.round()]
+        parsed[integral.index] = pd.to_datetime(integral.astype('int64').astype(str), format='%Y%m%d', errors='coerce')
+    return parsed.dt.strftime('%Y-%m-%d').astype(object).where(parsed.notna(), None)
+
+def clean_text_column(values: pd.Series) -> pd.Series:
+    """Vectorized str(...).strip() that maps blanks/NaN to '' and keeps integer IDs integral."""
+    if pd.api.types.is_float_dtype(values):
+        non_null = values.dropna()
+        if (non_null == non_null.round()).all():
+            # A numeric ID column with blanks is read as float; avoid '1001.0'
+            values = values.astype('Int64')
+    values = values.astype(object)
+    return values.where(values.notna(), '').astype(str).str.strip()
+
+def format_row_errors(rows, message: str) -> str:
+    """Summarise a vector of sheet row numbers sharing one validation error."""
+    rows = list(rows)
+    shown = ', '.join(str(r) for r in rows[:MAX_ROWS_PER_ERROR])
+    more = f" (and {len(rows) - MAX_ROWS_PER_ERROR} more)" if len(rows) > MAX_ROWS_PER_ERROR else ''
+    label = 'Row' if len(rows) == 1 else 'Rows'
+    return f"{label} {shown}{more}: {message}"
+
+@timed('parse.clean_performance_frame')
+def clean_performance_frame(raw: pd.DataFrame, first_row: int = 2) -> (pd.DataFrame, np.ndarray, list):
+    """Clean a raw performance sheet with whole-column operations.
+
+    Returns ``(clean, bad_rows, errors)``: ``clean`` holds the loadable rows under
+    performance_data column names, ``bad_rows`` the sheet row numbers with an
+    invalid 'Completion Date', and ``errors`` user-facing messages. Rows missing a
+    required value are left out of ``clean``; their count is kept in
+    ``clean.attrs['skipped_rows']``. Completely blank rows are ignored.
+    ``first_row`` is the sheet row number of ``raw``'s first row.
+    """
     errors = []
-    df = pd.read_excel(sheet, sheet_name='Global')
-    # Example: parse and clean numeric columns
-    for idx, row in df.iterrows():
-        for col in ['Total', 'India', 'NA', 'GGM']:
-            val = clean_number(row.get(col, None))
-            if val is None:
-                errors.append(f"Row {idx+2}: Invalid number in '{col}'")
-            df.at[idx, col] = val
-    return df, errors
+    raw = raw.rename(columns={c: str(c).strip() for c in raw.columns})
+    columns = {}
+    for field, headers in PERFORMANCE_COLUMNS.items():
+        header = next((h for h in headers if h in raw.columns), None)
+        if header is None:
+            errors.append(f"Missing column: {headers[0]}")
+        else:
+            columns[field] = raw[header]
+    if errors:
+        return pd.DataFrame(columns=list(PERFORMANCE_COLUMNS) + ['feedback']), np.array([], dtype=int), errors
+    clean = pd.DataFrame({
+        field: clean_date_column(col) if field == 'completion_date' else clean_text_column(col)
+        for field, col in columns.items()
+    })
+    clean['feedback'] = None
+    sheet_rows = np.arange(len(clean)) + first_row
+    text_present = [(clean[f] != '').to_numpy() for f in REQUIRED_PERFORMANCE_FIELDS if f != 'completion_date']
+    has_date = clean['completion_date'].notna().to_numpy()
+    blank = ~np.logical_or.reduce(text_present + [has_date])
+    bad_dates = ~has_date & ~blank
+    bad_rows = sheet_rows[bad_dates]
+    if len(bad_rows):
+        errors.append(format_row_errors(bad_rows, "Invalid date format in 'Completion Date'"))
+    complete = np.logical_and.reduce(text_present)
+    keep = complete & has_date
+    skipped = int((~complete & has_date).sum())
+    clean = clean[keep].reset_index(drop=True)
+    clean.attrs['skipped_rows'] = skipped
+    return clean, bad_rows, errors
+
+@timed('parse.parse_performance_data')
+def parse_performance_data(sheet, sheet_name=0) -> (pd.DataFrame, list):
+    """Parse and validate the 'Global Strategic Alliances Partner Performance Dashboard as of May 2025 [Sample data]' sheet."""
+    # keep_default_na=False so the 'NA' geo is read as text rather than NaN
+    raw = pd.read_excel(sheet, sheet_name=sheet_name, keep_default_na=False)
+    clean, _, errors = clean_performance_frame(raw)
+    return clean, errors
+
+def iter_performance_chunks(sheet, chunk_size: int = STREAM_CHUNK_ROWS, sheet_name: str = None):
+    """Stream the performance sheet in cleaned, fixed-size chunks.
+
+    Uses openpyxl's read-only row iterator so only ``chunk_size`` raw rows are held
+    in memory at a time. Yields ``(clean, bad_rows, rows_read, total_rows)`` per
+    chunk, where ``total_rows`` is the data row count declared by the sheet (None if
+    the workbook does not record it). Reads ``sheet_name``, or the first sheet.
+    Raises ValueError if a column is missing.
+    """
+    from openpyxl import load_workbook
+    workbook = load_workbook(sheet, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        total_rows = worksheet.max_row - 1 if worksheet.max_row else None
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else '' for h in header]
+        missing = [headers[0] for headers in PERFORMANCE_COLUMNS.values() if not any(h in header for h in headers)]
+        if missing:
+            raise ValueError("; ".join(f"Missing column: {col}" for col in missing))
+        width, buffer, first_row, rows_read = len(header), [], 2, 0
+
+        def flush():
+            raw = pd.DataFrame(buffer, columns=header)
+            clean, bad_rows, _ = clean_performance_frame(raw, first_row=first_row)
+            return clean, bad_rows, rows_read, total_rows
+
+        for row in rows:
+            # Read-only rows can be shorter or longer than the header row
+            if len(row) != width:
+                row = (tuple(row) + (None,) * width)[:width]
+            buffer.append(row)
+            rows_read += 1
+            if len(buffer) == chunk_size:
+                yield flush()
+                first_row += len(buffer)
+                buffer = []
+        if buffer:
+            yield flush()
+    finally:
+        workbook.close()
+
+def clean_number_column(values: pd.Series) -> (pd.Series, np.ndarray):
+    """Vectorized clean_number: floats, NaN where a cell is blank or not a number.
+
+    Also returns a mask of the cells that were filled in but are not numbers.
+    """
+    text = values.astype(object).where(values.notna(), '').astype(str).str.strip()
+    filled = text != ''
+    parsed = pd.to_numeric(values.where(filled), errors='coerce').astype(float)
+    # Only text such as '$1,200' or '₹ 5,000' needs the character stripping
+    retry = parsed.isna() & filled
+    if retry.any():
+        stripped = text[retry].str.replace(r'[^0-9.\-]', '', regex=True)
+        parsed[retry] = pd.to_numeric(stripped.where(stripped != ''), errors='coerce')
+    return parsed, (parsed.isna() & filled).to_numpy()
+
+def _read_sheet(sheet, sheet_name) -> pd.DataFrame:
+    # keep_default_na=False so the 'NA' geo is read as text rather than NaN
+    raw = pd.read_excel(sheet, sheet_name=sheet_name, keep_default_na=False)
+    return raw.rename(columns={c: str(c).strip() for c in raw.columns})
+
+def clean_metrics_frame(raw: pd.DataFrame, spec: dict, numeric: tuple, required: tuple = ()) -> (pd.DataFrame, list):
+    """Clean a report sheet laid out as one record per row (see METRICS_SHEETS).
+
+    ``spec`` maps table columns to accepted headers; its first column must be
+    filled in for a row to be loaded (other rows are ignored as blank) and the
+    ``numeric`` columns are converted with clean_number_column. ``required``
+    columns must be present and filled in on every loaded row; other columns
+    missing from the sheet are loaded as NULL.
+    """
+    errors, clean = [], pd.DataFrame(index=raw.index)
+    for field, headers in spec.items():
+        header = next((h for h in headers if h in raw.columns), None)
+        if header is not None:
+            clean[field] = raw[header]
+        elif field == next(iter(spec)) or field in required:
+            errors.append(f"Missing column: {headers[0]}")
+    if errors:
+        return pd.DataFrame(columns=list(spec)), errors
+    key = next(iter(spec))
+    clean[key] = clean_text_column(clean[key])
+    clean = clean[clean[key] != ''].reset_index()
+    sheet_rows = clean.pop('index').to_numpy() + 2
+    for field in clean.columns:
+        if field in numeric:
+            clean[field], invalid = clean_number_column(clean[field])
+            if invalid.any():
+                errors.append(format_row_errors(sheet_rows[invalid], f"Invalid number in '{spec[field][0]}'"))
+            blank = clean[field].isna().to_numpy() & ~invalid
+        elif field != key:
+            clean[field] = clean_text_column(clean[field]).replace('', None)
+            blank = clean[field].isna().to_numpy()
+        else:
+            continue
+        if field in required and blank.any():
+            errors.append(format_row_errors(sheet_rows[blank], f"Missing value in '{spec[field][0]}'"))
+    return clean, errors
+
+@timed('parse.parse_global_metrics')
+def parse_global_metrics(sheet, sheet_name=GLOBAL_SHEET) -> (pd.DataFrame, list):
+    """Parse the 'Global' sheet into global_metrics rows (metric_name, value, geo).
+
+    The first column names the metric (e.g. 'Metrices YTD'); each of the 'Total'
+    and per-geo columns present becomes one row, with geo NULL for 'Total'.
+    """
+    raw = _read_sheet(sheet, sheet_name)
+    if raw.shape[1] == 0:
+        return pd.DataFrame(columns=['metric_name', 'value', 'geo']), ["The 'Global' sheet is empty."]
+    value_columns = [col for col in ('Total',) + GLOBAL_GEOS if col in raw.columns]
+    if not value_columns:
+        return pd.DataFrame(columns=['metric_name', 'value', 'geo']), ["Missing column: Total"]
+    clean, errors = clean_metrics_frame(raw, {'metric_name': (raw.columns[0],), **{col: (col,) for col in value_columns}},
+                                        numeric=tuple(value_columns))
+    metrics = clean.melt(id_vars='metric_name', value_vars=value_columns, var_name='geo', value_name='value')
+    metrics = metrics[metrics['value'].notna()]
+    metrics['geo'] = metrics['geo'].where(metrics['geo'] != 'Total', None)
+    return metrics[['metric_name', 'value', 'geo']].reset_index(drop=True), errors
+
+def parse_metrics_sheet(kind: str, sheet, sheet_name=None) -> (pd.DataFrame, list):
+    """Parse the BU Wise Report, Alliance Wise Report or Cost Savings sheet (``kind`` in METRICS_SHEETS)."""
+    default_name, spec, numeric, required = METRICS_SHEETS[kind]
+    with timer(f'parse.{kind}'):
+        clean, errors = clean_metrics_frame(_read_sheet(sheet, sheet_name or default_name), spec, numeric, required)
+        if kind == 'bu_metrics' and 'achievement_percent' not in clean.columns and len(clean):
+            # Not every export has the column; derive it from target and completed
+            target = clean['target'].where(clean['target'] > 0)
+            clean['achievement_percent'] = (clean['completed'] / target * 100).round(2)
+        return clean, errors
+
+def _parse_workbook_sheet(kind: str, data: bytes, sheet_name: str) -> (pd.DataFrame, list):
+    # Runs in a worker process: parses one sheet of the workbook bytes
+    import io
+    if kind == 'performance_data':
+        return parse_performance_data(io.BytesIO(data), sheet_name)
+    if kind == 'global_metrics':
+        return parse_global_metrics(io.BytesIO(data), sheet_name)
+    return parse_metrics_sheet(kind, io.BytesIO(data), sheet_name)
+
+def _normalise_sheet_name(name: str) -> str:
+    return ' '.join(str(name).split()).casefold()
+
+def recognise_sheets(sheet_names: list) -> dict:
+    """Map table -> sheet name for the sheets of a workbook this importer understands.
+
+    The report sheets are matched by name; the performance data is the first
+    other sheet, as for a single-sheet upload. Any further sheets are ignored.
+    """
+    by_name = {_normalise_sheet_name(name): name for name in sheet_names}
+    sheets = {}
+    for table, sheet_name in (('global_metrics', GLOBAL_SHEET),) + tuple((table, spec[0]) for table, spec in METRICS_SHEETS.items()):
+        if _normalise_sheet_name(sheet_name) in by_name:
+            sheets[table] = by_name[_normalise_sheet_name(sheet_name)]
+    others = [name for name in sheet_names if name not in sheets.values()]
+    if others:
+        sheets['performance_data'] = others[0]
+    return sheets
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn rather than fork: forking the multi-threaded Streamlit server is unsafe
+            _pool = ProcessPoolExecutor(max_workers=WORKBOOK_PARSE_PROCESSES,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+@timed('parse.parse_workbook')
+def parse_workbook(source, tables: tuple = None) -> (dict, dict, list):
+    """Parse every recognised sheet of a workbook (bytes, path or file object) at once.
+
+    The file is read once; its sheets are then parsed concurrently in a process
+    pool, so the total time is close to that of the slowest sheet. ``tables``
+    limits which tables are parsed. Returns ``(frames, sheets, errors)``: table ->
+    cleaned frame, table -> sheet name of every recognised sheet, and error
+    messages prefixed with the sheet name. Falls back to parsing in this process
+    if the pool cannot be used.
+    """
+    import io
+    from concurrent.futures.process import BrokenProcessPool
+    from openpyxl import load_workbook
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            data = f.read()
+    else:
+        source.seek(0)
+        data = source.read()
+    workbook = load_workbook(io.BytesIO(data), read_only=True)
+    try:
+        sheets = recognise_sheets(workbook.sheetnames)
+    finally:
+        workbook.close()
+    selected = {table: name for table, name in sheets.items() if tables is None or table in tables}
+    results = {}
+    # With a single core a pool only adds process start-up and pickling
+    if len(selected) > 1 and WORKBOOK_PARSE_PROCESSES > 1:
+        try:
+            pool = _get_pool()
+            futures = {table: pool.submit(_parse_workbook_sheet, table, data, name) for table, name in selected.items()}
+            results = {table: future.result() for table, future in futures.items()}
+        except (BrokenProcessPool, OSError) as e:
+            logging.warning(f'Workbook parse pool unavailable, parsing in process: {e}')
+            _reset_pool()
+            results = {}
+    for table, name in selected.items():
+        if table not in results:
+            results[table] = _parse_workbook_sheet(table, data, name)
+    frames, errors = {}, []
+    for table, (frame, sheet_errors) in results.items():
+        frames[table] = frame
+        errors.extend(f"{sheets[table]}: {error}" for error in sheet_errors)
+    return frames, sheets, errors
@@ -0,0 +1,132 @@
+# On-disk cache of CSV/Excel exports of performance_data
+#
+# An export is generated only when asked for, streamed from a SQLite cursor a
+# chunk at a time (iter_performance_rows) straight into the file, and kept in
+# EXPORT_DIR keyed by (filter state, data version, format). Repeated downloads of
+# the same view, from any session, are served from that file. Files of older data
+# versions are deleted as soon as a newer one is written, and at most
+# EXPORT_CACHE_MAX_FILES are kept.
+
+import csv
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from config import EXPORT_DIR, EXPORT_CHUNK_ROWS, EXPORT_CACHE_MAX_FILES
+from utils.instrumentation import timed, incr
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_SHEET = 'Performance Data'
+# Data rows per worksheet: Excel's limit less the header row
+EXCEL_MAX_ROWS = 1048575
+
+# The data version restarts at 0 in every process, so file names carry a token
+# of the process that wrote them
+_run_id = uuid.uuid4().hex[:8]
+_locks = {}
+_locks_lock = threading.Lock()
+
+def _export_name(filters: dict, version: int, fmt: str) -> str:
+    from db.database_operations import filter_state_key
+    digest = hashlib.sha1(repr(filter_state_key(filters)).encode('utf-8')).hexdigest()[:16]
+    return f'performance_{_run_id}_v{version}_{digest}.{fmt}'
+
+def _key_lock(name: str) -> threading.Lock:
+    # One generation per file at a time; concurrent requests wait and reuse it
+    with _locks_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+def find_export(filters: dict = None, fmt: str = 'csv') -> str:
+    """Path of the cached export of the current data for ``filters``, or None if not generated yet."""
+    from db.database_operations import get_data_version
+    path = os.path.join(EXPORT_DIR, _export_name(filters, get_data_version(), fmt))
+    return path if os.path.exists(path) else None
+
+@timed('export.generate')
+def export_performance_data(filters: dict = None, fmt: str = 'csv') -> str:
+    """Generate (or reuse) the export of performance_data matching ``filters``; returns its path."""
+    from db.database_operations import get_data_version, iter_performance_rows, PERFORMANCE_INSERT_COLUMNS
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    version = get_data_version()
+    name = _export_name(filters, version, fmt)
+    path = os.path.join(EXPORT_DIR, name)
+    with _key_lock(name):
+        if os.path.exists(path):
+            incr('export_cache.hits')
+            return path
+        incr('export_cache.misses')
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        temp = path + f'.{uuid.uuid4().hex}.tmp'
+        chunks = iter_performance_rows(filters, PERFORMANCE_INSERT_COLUMNS, EXPORT_CHUNK_ROWS)
+        try:
+            if fmt == 'csv':
+                _write_csv(temp, PERFORMANCE_INSERT_COLUMNS, chunks)
+            else:
+                _write_xlsx(temp, PERFORMANCE_INSERT_COLUMNS, chunks)
+        except Exception:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        # A write landing while exporting only makes the file newer than its
+        # version; it is pruned as stale once the next version is exported
+        os.replace(temp, path)
+    _prune_exports(keep=name)
+    return path
+
+def _write_csv(path: str, columns: tuple, chunks):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+
+def _write_xlsx(path: str, columns: tuple, chunks):
+    import xlsxwriter
+    # constant_memory flushes each row to disk once the next one starts, so memory
+    # stays flat; rows must therefore be written strictly in order
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    worksheet, row, sheets = None, EXCEL_MAX_ROWS, 0
+    for rows in chunks:
+        for values in rows:
+            if row == EXCEL_MAX_ROWS:
+                # Larger exports continue on further sheets
+                sheets += 1
+                worksheet = workbook.add_worksheet(EXPORT_SHEET if sheets == 1 else f'{EXPORT_SHEET} {sheets}')
+                worksheet.write_row(0, 0, columns)
+                row = 0
+            row += 1
+            worksheet.write_row(row, 0, values)
+    if worksheet is None:
+        workbook.add_worksheet(EXPORT_SHEET).write_row(0, 0, columns)
+    workbook.close()
+
+def write_xlsx_tables(path: str, tables: dict):
+    """Write ``tables`` (sheet name -> DataFrame) to one workbook, in constant_memory mode."""
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    for sheet, df in tables.items():
+        worksheet = workbook.add_worksheet(sheet[:31])
+        worksheet.write_row(0, 0, list(df.columns))
+        # NaN is not a valid cell value; None leaves the cell blank
+        values = df.astype(object)
+        for row, cells in enumerate(values.where(values.notna(), None).itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row, 0, cells)
+    workbook.close()
+
+def _prune_exports(keep: str):
+    # Drop files of other data versions or processes, then the oldest beyond the cap
+    from db.database_operations import get_data_version
+    prefix = f'performance_{_run_id}_v{get_data_version()}_'
+    try:
+        # Temporary files belong to exports still being written
+        entries = [entry for entry in os.scandir(EXPORT_DIR)
+                   if entry.is_file() and entry.name != keep and not entry.name.endswith('.tmp')]
+        stale = [entry for entry in entries if not entry.name.startswith(prefix)]
+        current = sorted((entry for entry in entries if entry.name.startswith(prefix)),
+                         key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in stale + current[EXPORT_CACHE_MAX_FILES - 1:]:
+            os.remove(entry.path)
+    except OSError as e:
+        logging.warning(f'Could not prune exports: {e}')
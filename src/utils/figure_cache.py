@@ -0,0 +1,70 @@
+# Process-wide LRU cache of built Plotly figures
+#
+# Figures are keyed by (chart id, filter state, data version, role) and shared by
+# every session, so a rerun that changes nothing the chart depends on (switching
+# tabs, typing in a form) reuses the built figure instead of running Plotly
+# Express again. Entries are sized by their JSON and evicted least recently used
+# first once FIGURE_CACHE_MAX_BYTES is exceeded; entries for older data versions
+# are dropped as soon as a newer version is seen.
+
+import threading
+from collections import OrderedDict
+from config import FIGURE_CACHE_MAX_BYTES
+from utils.instrumentation import timer, incr
+
+_figures = OrderedDict()  # key -> (figure, size in bytes)
+_lock = threading.Lock()
+_state = {'version': None, 'bytes': 0}
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def _drop_locked(key):
+    _, size = _figures.pop(key)
+    _state['bytes'] -= size
+
+def cached_figure(chart_id: str, build, filters: dict = None, role: str = None, version: int = None):
+    """Return the figure for (chart_id, filters, data version, role).
+
+    ``version`` is the data version read before fetching the data ``build`` draws
+    from, so a figure of older data is never cached under a newer version; it
+    defaults to the current version, which is only safe when ``build()`` reads the
+    data itself. ``build()`` is called only on a miss. Cached figures are shared
+    between sessions and must not be modified by the caller.
+    """
+    from db.database_operations import get_data_version, filter_state_key
+    if version is None:
+        version = get_data_version()
+    key = (chart_id, filter_state_key(filters), version, role)
+    with _lock:
+        if key in _figures:
+            _figures.move_to_end(key)
+            _stats['hits'] += 1
+            incr('figure_cache.hits')
+            return _figures[key][0]
+        _stats['misses'] += 1
+    incr('figure_cache.misses')
+    with timer(f'chart.{chart_id}'):
+        figure = build()
+        size = len(figure.to_json())
+    with _lock:
+        if _state['version'] is None or version > _state['version']:
+            _figures.clear()
+            _state['version'], _state['bytes'] = version, 0
+        elif version < _state['version']:
+            # Built from data read before a write; newer figures are already cached
+            return figure
+        if size > FIGURE_CACHE_MAX_BYTES or key in _figures:
+            return figure
+        _figures[key] = (figure, size)
+        _state['bytes'] += size
+        while _state['bytes'] > FIGURE_CACHE_MAX_BYTES:
+            _drop_locked(next(iter(_figures)))
+            _stats['evictions'] += 1
+    return figure
+
+def get_figure_cache_stats() -> dict:
+    """Hit/miss/eviction counters plus current entry count and size."""
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = len(_figures)
+        stats['bytes'] = _state['bytes']
+    return stats
@@ -0,0 +1,121 @@
+# Background runner for workbook imports
+#
+# The Load button hands the uploaded bytes to submit_import() and returns at
+# once. A worker thread then writes the backup, parses and validates every
+# recognised sheet and loads them together, recording each step in the
+# import_jobs table (db/import_jobs.py). The Data Management tab polls that
+# table, so the admin can keep using the dashboard, or leave the tab, while a
+# large file loads.
+
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import IMPORT_WORKERS, STREAMING_UPLOAD_THRESHOLD_BYTES
+from db.database_operations import METRICS_TABLES
+from db.import_jobs import create_import_job, update_import_job
+from utils.backup_store import store_backup
+from utils.instrumentation import timed
+
+# Load modes: apply only the differences, or replace every record
+IMPORT_MODES = ('sync', 'replace')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix='import')
+        return _executor
+
+def submit_import(data: bytes, filename: str, mode: str = 'sync', created_by: str = None) -> int:
+    """Queue an import of an uploaded workbook; returns the job id.
+
+    ``mode`` says how performance_data is loaded; the report sheets always
+    overwrite their tables. The performance sheet of a workbook larger than
+    STREAMING_UPLOAD_THRESHOLD_BYTES is always streamed and replaces every record.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+    streaming = len(data) > STREAMING_UPLOAD_THRESHOLD_BYTES
+    job_id = create_import_job(filename, 'stream' if streaming else mode, created_by)
+    _get_executor().submit(_run_import, job_id, data, filename, mode, streaming, created_by)
+    return job_id
+
+def submit_report_pack(trigger: str = 'manual'):
+    """Queue a build of the report pack (utils/report_pack.py) on the import workers."""
+    from utils.report_pack import build_report_pack
+    _get_executor().submit(build_report_pack, trigger)
+
+def submit_snapshot_restore(created_by: str = None) -> int:
+    """Queue a rebuild of performance_data from the columnar snapshot of the last load; returns the job id."""
+    from db.columnar_snapshot import get_snapshot_info
+    info = get_snapshot_info() or {}
+    job_id = create_import_job(info.get('filename'), 'snapshot', created_by)
+    _get_executor().submit(_run_snapshot_restore, job_id, info.get('rows'))
+    return job_id
+
+@timed('import.snapshot_restore')
+def _run_snapshot_restore(job_id: int, rows: int = None):
+    from db.columnar_snapshot import restore_performance_snapshot
+    try:
+        update_import_job(job_id, status='inserting', rows_total=rows)
+        success, msg = restore_performance_snapshot()
+        if success:
+            update_import_job(job_id, status='done', rows_processed=rows or 0, message=msg)
+            submit_report_pack('restore')
+        else:
+            update_import_job(job_id, status='failed', message="The snapshot could not be restored.", errors=msg)
+    except Exception as e:
+        logging.error(f'Error running snapshot restore job {job_id}: {e}')
+        update_import_job(job_id, status='failed', message="The restore stopped with an error.", errors=str(e))
+
+@timed('import.job')
+def _run_import(job_id: int, data: bytes, filename: str, mode: str, streaming: bool, created_by: str = None):
+    from db.database_operations import replace_performance_data_chunked, replace_workbook_data
+    from db.columnar_snapshot import write_performance_snapshot
+    from utils.excel_parser import parse_workbook, iter_performance_chunks
+    try:
+        # Identical re-uploads (and restores) share one stored copy
+        backup = store_backup(data, filename, created_by)
+        update_import_job(job_id, status='parsing', backup_path=backup['path'])
+        # Every recognised sheet is parsed at once; for a streamed workbook only the
+        # report sheets, as the performance rows are validated while they are inserted
+        frames, sheets, errors = parse_workbook(data, tables=tuple(METRICS_TABLES) if streaming else None)
+        if errors:
+            update_import_job(job_id, status='failed', message="The workbook did not pass validation.",
+                              errors="\n".join(errors))
+            return
+        if not sheets:
+            update_import_job(job_id, status='failed', message="The workbook has no sheet to load.")
+            return
+        if streaming:
+            update_import_job(job_id, status='inserting')
+            progress = {'rows': 0}
+            def report_progress(rows_read, total_rows):
+                progress['rows'] = rows_read
+                update_import_job(job_id, rows_processed=rows_read, rows_total=total_rows)
+            chunks = iter_performance_chunks(io.BytesIO(data), sheet_name=sheets.get('performance_data'))
+            success, msg = replace_performance_data_chunked(chunks, on_progress=report_progress, tables=frames)
+            rows = progress['rows']
+        else:
+            df = frames.get('performance_data')
+            skipped = df.attrs.get('skipped_rows', 0) if df is not None else 0
+            rows = len(df) + skipped if df is not None else 0
+            update_import_job(job_id, status='inserting', rows_total=rows)
+            # All tables commit together: a failure leaves every one unchanged
+            success, msg = replace_workbook_data(frames, performance_mode=mode)
+            if success and skipped:
+                msg += f" {skipped} rows with missing required values were skipped."
+        if success:
+            # Typed copy of the loaded rows, so a restore needs no Excel parsing
+            write_performance_snapshot(filename=filename, backup_sha256=backup['sha256'])
+            update_import_job(job_id, status='done', rows_processed=rows, message=msg)
+            submit_report_pack('load')
+        else:
+            update_import_job(job_id, status='failed', message="The data could not be loaded.", errors=msg)
+    except Exception as e:
+        logging.error(f'Error running import job {job_id}: {e}')
+        update_import_job(job_id, status='failed', message="The import stopped with an error.", errors=str(e))
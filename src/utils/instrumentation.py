@@ -0,0 +1,132 @@
+# Lightweight timing and counter instrumentation for the hot paths
+#
+# timer(name) / @timed(name) measure a block or function and incr(name) bumps a
+# counter. Every measurement goes to two places:
+#   - the profile of the rerun running on the current thread (begin_rerun /
+#     end_rerun in app.py), shown in the admin Performance panel and written to
+#     the rotating log as one JSON line per rerun;
+#   - process-wide recent samples per timer, summarised as percentiles.
+# Measurements taken outside a rerun (e.g. a benchmark script) only feed the
+# process-wide figures. Timers are inclusive: a DB helper called from a chart
+# builder counts towards both.
+
+import functools
+import json
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+import numpy as np
+from config import METRICS_SAMPLES_PER_TIMER, METRICS_SUMMARY_INTERVAL
+
+_samples = defaultdict(lambda: deque(maxlen=METRICS_SAMPLES_PER_TIMER))  # name -> recent seconds
+_calls = Counter()
+_counters = Counter()
+_lock = threading.Lock()
+_state = {'last_summary': time.monotonic(), 'reruns': 0}
+_local = threading.local()
+
+def _record(name: str, elapsed: float):
+    with _lock:
+        _samples[name].append(elapsed)
+        _calls[name] += 1
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        timing = run['timings'].setdefault(name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += elapsed
+
+@contextmanager
+def timer(name: str):
+    """Time the enclosed block under ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+def timed(name: str):
+    """Decorator form of timer()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def incr(name: str, n: int = 1):
+    """Add ``n`` to the counter ``name``."""
+    with _lock:
+        _counters[name] += n
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        run['counters'][name] += n
+
+def begin_rerun(**fields):
+    """Start collecting a profile for the script run on this thread; ``fields`` are logged with it."""
+    _local.run = {'start': time.perf_counter(), 'timings': {}, 'counters': Counter(), 'fields': fields}
+
+def end_rerun(**fields) -> dict:
+    """Finish the current rerun profile, log it and return it (None if none was started).
+
+    The profile is {'total_ms', 'timings': {name: {'calls', 'ms'}}, 'counters', **fields}.
+    """
+    run = getattr(_local, 'run', None)
+    _local.run = None
+    if run is None:
+        return None
+    profile = dict(run['fields'])
+    profile.update(fields)
+    profile['total_ms'] = round((time.perf_counter() - run['start']) * 1000, 3)
+    profile['timings'] = {name: {'calls': calls, 'ms': round(seconds * 1000, 3)}
+                          for name, (calls, seconds) in run['timings'].items()}
+    profile['counters'] = dict(run['counters'])
+    _record('rerun', profile['total_ms'] / 1000)
+    _log('rerun', profile)
+    with _lock:
+        _state['reruns'] += 1
+        due = time.monotonic() - _state['last_summary'] >= METRICS_SUMMARY_INTERVAL
+        if due:
+            _state['last_summary'] = time.monotonic()
+    if due:
+        log_metrics_summary()
+    return profile
+
+def get_timer_stats() -> list:
+    """Per timer: calls since start and p50/p95/p99/max milliseconds over the recent samples."""
+    with _lock:
+        snapshot = {name: (list(samples), _calls[name]) for name, samples in _samples.items()}
+    stats = []
+    for name, (samples, calls) in sorted(snapshot.items()):
+        if not samples:
+            continue
+        p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+        stats.append({'name': name, 'calls': calls, 'samples': len(samples),
+                      'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3),
+                      'p99_ms': round(float(p99), 3), 'max_ms': round(max(samples) * 1000, 3)})
+    return stats
+
+def get_counters() -> dict:
+    with _lock:
+        return dict(_counters)
+
+def log_metrics_summary():
+    """Write the process-wide percentiles and counters to the log as one JSON line."""
+    _log('summary', {'timers': get_timer_stats(), 'counters': get_counters()})
+
+def reset_metrics():
+    with _lock:
+        _samples.clear()
+        _calls.clear()
+        _counters.clear()
+
+def _log(event: str, payload: dict):
+    # One JSON object per line, so the log can be filtered with e.g. jq
+    from utils.logger import metrics_logger
+    record = {'event': event}
+    record.update(payload)
+    metrics_logger.info(json.dumps(record, default=str, sort_keys=True))
@@ -15,3 +15,10 @@ handler.setFormatter(formatter)
 
 if not logger.hasHandlers():
     logger.addHandler(handler)
+
+# Structured metrics from utils/instrumentation.py: JSON lines that go to the
+# rotating file only, not to the console
+metrics_logger = logger.getChild('metrics')
+metrics_logger.propagate = False
+if not metrics_logger.handlers:
+    metrics_logger.addHandler(handler)
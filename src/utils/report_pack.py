@@ -0,0 +1,178 @@
+# Headless builder of the standard report pack
+#
+# Renders the reports leadership pulls every day (BU Wise, Alliance Wise, Cost
+# Savings, plus the overview charts) to disk, without a browser session:
+# the admin chart builders (ui/admin_dashboard.py) are run on the unfiltered
+# rollup and written as standalone HTML, Plotly JSON and, when kaleido is
+# installed, PNG; each report's tables go into an Excel workbook through the
+# export writer (utils/export_cache.py). The dashboard then serves the pack
+# instead of computing the reports on request.
+#
+# A pack is built after every successful load (utils/import_runner.py) and by
+#   python main.py --build-report-pack
+# which can be run from cron or Task Scheduler, e.g. every morning. Each pack
+# goes to its own directory under REPORT_PACK_DIR; latest.json is switched to it
+# atomically once it is complete, and the oldest packs beyond REPORT_PACK_KEEP
+# are deleted.
+
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from config import REPORT_PACK_DIR, REPORT_PACK_KEEP
+from utils.instrumentation import timed, timer
+
+LATEST_FILE = 'latest.json'
+MANIFEST_FILE = 'manifest.json'
+# report key -> (title, chart shown with it, workbook file name)
+REPORT_PACK_REPORTS = {
+    'bu_wise': ("BU Wise Report", 'cert_by_bu', 'bu_wise_report.xlsx'),
+    'alliance_wise': ("Alliance Wise Report", 'cert_by_alliance', 'alliance_wise_report.xlsx'),
+    'cost_savings': ("Cost Savings", None, 'cost_savings_report.xlsx'),
+}
+# Columns of the metric tables that are bookkeeping, not report content
+_INTERNAL_COLUMNS = ['id', 'created_at']
+
+# Builds run one at a time; a build queued behind another sees the newer data
+_build_lock = threading.Lock()
+# The pack being served: its name, manifest and the figures read from it so far
+_loaded = {'pack': None, 'manifest': None, 'figures': {}}
+_loaded_lock = threading.Lock()
+
+def _report_charts() -> dict:
+    from ui.admin_dashboard import plot_cert_by_alliance, plot_cert_by_bu, plot_cert_by_geo, plot_monthly_trend
+    return {
+        'cert_by_alliance': plot_cert_by_alliance,
+        'cert_by_bu': plot_cert_by_bu,
+        'cert_by_geo': plot_cert_by_geo,
+        'monthly_trend': plot_monthly_trend,
+    }
+
+def _report_tables() -> tuple:
+    # The unfiltered rollup, and report key -> {sheet name: frame}
+    from db.database_operations import (get_performance_rollup, rollup_counts, get_all_bu_metrics,
+                                        get_all_alliance_metrics, get_all_cost_savings)
+    rollup = get_performance_rollup()
+    def table(df):
+        if df is None:
+            raise ValueError("A report table could not be read.")
+        return df.drop(columns=[col for col in _INTERNAL_COLUMNS if col in df.columns])
+    return rollup, {
+        'bu_wise': {'Certifications': rollup_counts(rollup, 'business_unit'), 'Targets': table(get_all_bu_metrics())},
+        'alliance_wise': {'Certifications': rollup_counts(rollup, 'alliance_type'), 'Targets': table(get_all_alliance_metrics())},
+        'cost_savings': {'Cost Savings': table(get_all_cost_savings())},
+    }
+
+@timed('report_pack.build')
+def build_report_pack(trigger: str = 'manual') -> tuple[bool, str]:
+    """Render the report pack to a new directory and make it the latest; returns (success, message)."""
+    import plotly.io as pio
+    from db.database_operations import count_performance_rows
+    from utils.export_cache import write_xlsx_tables
+    with _build_lock:
+        stamp = datetime.datetime.now()
+        pack = f"pack_{stamp.strftime('%Y%m%dT%H%M%S%f')}_{uuid.uuid4().hex[:6]}"
+        pack_dir = os.path.join(REPORT_PACK_DIR, pack)
+        try:
+            os.makedirs(os.path.join(pack_dir, 'charts'))
+            rollup, tables = _report_tables()
+            charts = {}
+            can_render_images = _kaleido_available()
+            for chart_id, build in _report_charts().items():
+                with timer(f'report_pack.chart.{chart_id}'):
+                    figure = build(rollup)
+                    files = {'html': f'charts/{chart_id}.html', 'json': f'charts/{chart_id}.json'}
+                    # 'directory' writes plotly.min.js once next to the pages instead of into each
+                    figure.write_html(os.path.join(pack_dir, files['html']), include_plotlyjs='directory')
+                    with open(os.path.join(pack_dir, files['json']), 'w', encoding='utf-8') as f:
+                        f.write(pio.to_json(figure))
+                    if can_render_images:
+                        files['png'] = f'charts/{chart_id}.png'
+                        figure.write_image(os.path.join(pack_dir, files['png']))
+                charts[chart_id] = files
+            reports = {}
+            for key, (title, chart_id, workbook) in REPORT_PACK_REPORTS.items():
+                write_xlsx_tables(os.path.join(pack_dir, workbook), tables[key])
+                reports[key] = {
+                    'title': title, 'chart': chart_id, 'workbook': workbook,
+                    'tables': {sheet: json.loads(df.to_json(orient='split', index=False))
+                               for sheet, df in tables[key].items()},
+                }
+            manifest = {
+                'pack': pack, 'generated_at': stamp.isoformat(timespec='seconds'), 'trigger': trigger,
+                'records': count_performance_rows(), 'charts': charts, 'reports': reports,
+            }
+            with open(os.path.join(pack_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            _write_latest(pack)
+        except Exception as e:
+            logging.error(f'Error building report pack: {e}')
+            shutil.rmtree(pack_dir, ignore_errors=True)
+            return False, str(e)
+        _prune_packs(keep=pack)
+        logging.info(f'Report pack {pack} built ({trigger}).')
+        return True, f"Report pack generated at {manifest['generated_at']}."
+
+def _kaleido_available() -> bool:
+    # Static images need the optional kaleido package; HTML and JSON do not
+    try:
+        import kaleido  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _write_latest(pack: str):
+    path = os.path.join(REPORT_PACK_DIR, LATEST_FILE)
+    temp = path + f'.{uuid.uuid4().hex}.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump({'pack': pack}, f)
+    os.replace(temp, path)
+
+def _prune_packs(keep: str):
+    packs = sorted(name for name in os.listdir(REPORT_PACK_DIR)
+                   if name.startswith('pack_') and name != keep)
+    for name in packs[:max(0, len(packs) - (REPORT_PACK_KEEP - 1))]:
+        shutil.rmtree(os.path.join(REPORT_PACK_DIR, name), ignore_errors=True)
+
+def get_report_pack() -> dict:
+    """Manifest of the latest complete pack, with 'dir' set to its directory, or None if none was built."""
+    try:
+        with open(os.path.join(REPORT_PACK_DIR, LATEST_FILE), encoding='utf-8') as f:
+            pack = json.load(f)['pack']
+    except (OSError, ValueError, KeyError):
+        return None
+    with _loaded_lock:
+        if _loaded['pack'] != pack:
+            try:
+                with open(os.path.join(REPORT_PACK_DIR, pack, MANIFEST_FILE), encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f'Error reading report pack {pack}: {e}')
+                return None
+            manifest['dir'] = os.path.join(REPORT_PACK_DIR, pack)
+            _loaded.update(pack=pack, manifest=manifest, figures={})
+        return _loaded['manifest']
+
+def get_report_pack_figure(chart_id: str):
+    """Figure of ``chart_id`` from the latest pack, or None. Shared between sessions: do not modify."""
+    import plotly.io as pio
+    manifest = get_report_pack()
+    if manifest is None or chart_id not in manifest['charts']:
+        return None
+    with _loaded_lock:
+        figure = _loaded['figures'].get(chart_id)
+        if figure is None:
+            with open(os.path.join(manifest['dir'], manifest['charts'][chart_id]['json']), encoding='utf-8') as f:
+                figure = pio.from_json(f.read())
+            # Only kept if no newer pack was loaded in the meantime
+            if _loaded['pack'] == manifest['pack']:
+                _loaded['figures'][chart_id] = figure
+        return figure
+
+def get_report_pack_table(manifest: dict, report: str, sheet: str):
+    import pandas as pd
+    table = manifest['reports'][report]['tables'][sheet]
+    return pd.DataFrame(table['data'], columns=table['columns'])
@@ -0,0 +1,105 @@
+# Reads while bulk loads are written: every read must succeed (no "database is
+# locked") and see either the old or the new load in full, with the rollup
+# matching the raw rows. benchmarks/stress_concurrent_reads.py measures the same
+# workload at scale.
+#
+#   python -m unittest discover tests
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+# A throwaway database, set before anything imports config
+os.environ.setdefault('ALLIANCES_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='alliances_test_'), 'test.sqlite3'))
+
+import pandas as pd
+from db import database_operations as dbo
+from db.bootstrap import ensure_database
+from db.connection_pool import pooled_connection
+
+READERS = 4
+LOADS = 4
+# Seconds before a stuck reader or writer fails the test
+TIMEOUT = 60
+
+
+def make_performance(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'associate_id': [str(1000 + i) for i in range(rows)],
+        'associate_name': [f'Associate {i}' for i in range(rows)],
+        'activity_code': [('AWS-01', 'AZ-204', 'GCP-ACE')[i % 3] for i in range(rows)],
+        'alliance_type': [('AWS', 'Microsoft', 'Google')[i % 3] for i in range(rows)],
+        'business_unit': [('BFSI', 'Retail')[i % 2] for i in range(rows)],
+        'geo': [('India', 'NA', 'GGM')[i % 3] for i in range(rows)],
+        'certification_name': 'Certification',
+        'completion_date': [f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}' for i in range(rows)],
+        'feedback': None,
+    })
+
+
+def read_snapshot() -> tuple:
+    # Both counts come from one read transaction, i.e. one WAL snapshot
+    with pooled_connection() as conn:
+        conn.execute("BEGIN")
+        rows = conn.execute("SELECT COUNT(*) FROM performance_data").fetchone()[0]
+        rolled_up = conn.execute("SELECT COALESCE(SUM(certifications), 0) FROM performance_rollup").fetchone()[0]
+        conn.rollback()
+    return rows, rolled_up
+
+
+def setUpModule():
+    ensure_database()
+
+
+class ConcurrentReadTests(unittest.TestCase):
+    def test_reads_during_bulk_writes(self):
+        frames = [make_performance(4000), make_performance(1500)]
+        sizes = {len(df) for df in frames}
+        ok, msg = dbo.replace_workbook_data({'performance_data': frames[0]})
+        self.assertTrue(ok, msg)
+        stop = threading.Event()
+        lock = threading.Lock()
+        failures, reads = [], [0]
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    count, rolled_up = read_snapshot()
+                    if count not in sizes or rolled_up != count:
+                        raise AssertionError(f"inconsistent snapshot: {count} rows, rollup {rolled_up}")
+                    if dbo.get_all_performance_data() is None:
+                        raise AssertionError("get_all_performance_data returned None")
+                except Exception as e:
+                    with lock:
+                        failures.append(repr(e))
+                with lock:
+                    reads[0] += 1
+
+        def writer(offset):
+            # Two writers at once: the second must queue, not fail
+            for i in range(LOADS):
+                ok, msg = dbo.replace_workbook_data({'performance_data': frames[(i + offset) % 2]})
+                if not ok:
+                    with lock:
+                        failures.append(f"writer: {msg}")
+
+        readers = [threading.Thread(target=reader) for _ in range(READERS)]
+        writers = [threading.Thread(target=writer, args=(offset,)) for offset in (0, 1)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join(TIMEOUT)
+        stop.set()
+        for thread in readers:
+            thread.join(TIMEOUT)
+        self.assertFalse(any(thread.is_alive() for thread in readers + writers), "threads did not finish")
+        self.assertEqual(failures, [])
+        self.assertGreater(reads[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
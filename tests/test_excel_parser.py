@@ -0,0 +1,71 @@
+# Completion Date cells of every type the workbooks contain, through both the
+# in-memory and the streaming parser.
+#
+#   python -m unittest discover tests
+
+import datetime
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# The parser imports config, which fixes the database path for every test module
+# in the run; point it at a throwaway file before that
+os.environ.setdefault('ALLIANCES_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='alliances_test_'), 'test.sqlite3'))
+
+from openpyxl import Workbook
+from utils.excel_parser import parse_performance_data, iter_performance_chunks
+
+HEADERS = ('Associate ID', 'Associate Name', 'Activity Code', 'Activity Name', 'Alliance Type',
+           'BU', 'Geo', 'Completion Date')
+# (cell value, stored date or None for a rejected row), from sheet row 2 on
+DATE_CELLS = (
+    (datetime.datetime(2024, 1, 5), '2024-01-05'),
+    (20240105, '2024-01-05'),
+    (20240106.0, '2024-01-06'),
+    ('07 Jan 2024', '2024-01-07'),
+    (45292, None),        # an Excel serial without a date format is not a date
+    (20240105.5, None),
+)
+
+
+def make_workbook(cells) -> io.BytesIO:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADERS)
+    for i, (value, _) in enumerate(cells):
+        sheet.append([1000 + i, f'Associate {i}', f'AWS-{i:03d}', 'AWS Certification', 'AWS', 'BFSI', 'NA', value])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class CompletionDateCellTests(unittest.TestCase):
+    def setUp(self):
+        self.valid_cells = [cell for cell in DATE_CELLS if cell[1]]
+        self.bad_rows = [row for row, (_, date) in enumerate(DATE_CELLS, start=2) if date is None]
+
+    def test_parse_performance_data_converts_every_cell_type(self):
+        df, errors = parse_performance_data(make_workbook(self.valid_cells))
+        self.assertEqual(errors, [])
+        self.assertEqual(df['completion_date'].tolist(), [date for _, date in self.valid_cells])
+
+    def test_parse_performance_data_rejects_other_numbers(self):
+        _, errors = parse_performance_data(make_workbook(DATE_CELLS))
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith(f"Rows {', '.join(map(str, self.bad_rows))}:"), errors[0])
+
+    def test_iter_performance_chunks(self):
+        dates, bad_rows = [], []
+        for clean, chunk_bad_rows, _, _ in iter_performance_chunks(make_workbook(DATE_CELLS), chunk_size=2):
+            dates.extend(clean['completion_date'].tolist())
+            bad_rows.extend(chunk_bad_rows.tolist())
+        self.assertEqual(dates, [date for _, date in self.valid_cells])
+        self.assertEqual(bad_rows, self.bad_rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
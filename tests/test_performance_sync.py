@@ -0,0 +1,108 @@
+# Incremental uploads (replace_workbook_data with performance_mode='sync'): rows
+# are matched on the natural key plus an occurrence number and compared by
+# content hash; the table and rollup must end up as a full replace would leave them.
+#
+#   python -m unittest discover tests
+
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+# A throwaway database, set before anything imports config
+os.environ.setdefault('ALLIANCES_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='alliances_test_'), 'test.sqlite3'))
+
+import pandas as pd
+from db import database_operations as dbo
+from db.bootstrap import ensure_database
+from db.connection_pool import pooled_connection
+
+COLUMNS = ('associate_id', 'associate_name', 'activity_code', 'alliance_type', 'business_unit',
+           'geo', 'certification_name', 'completion_date', 'feedback')
+
+
+def row(associate, activity, date, geo='NA', feedback=None) -> tuple:
+    return (associate, f'Associate {associate}', activity, 'AWS', 'BFSI', geo,
+            f'Certification {activity}', date, feedback)
+
+
+def frame(*rows) -> pd.DataFrame:
+    return pd.DataFrame(list(rows), columns=list(COLUMNS))
+
+
+BASE = (
+    row('1001', 'AWS-001', '2024-01-05'),
+    row('1002', 'AWS-002', '2024-01-06'),
+    row('1003', 'AWS-003', '2024-02-07'),
+)
+
+
+def setUpModule():
+    ensure_database()
+
+
+class PerformanceSyncTests(unittest.TestCase):
+    def setUp(self):
+        self.load(frame(*BASE))
+
+    def load(self, df, mode='replace') -> str:
+        ok, msg = dbo.replace_workbook_data({'performance_data': df}, performance_mode=mode)
+        self.assertTrue(ok, msg)
+        return msg
+
+    def stored(self) -> list:
+        with pooled_connection() as conn:
+            return conn.execute(f"SELECT id, {', '.join(COLUMNS)}, created_at FROM performance_data ORDER BY id").fetchall()
+
+    def rollup(self) -> list:
+        with pooled_connection() as conn:
+            return conn.execute("SELECT * FROM performance_rollup ORDER BY 1, 2, 3, 4").fetchall()
+
+    def assert_same_as_replace(self, df):
+        # Rows (without ids) and rollup as a full replace of ``df`` leaves them
+        synced_rows = sorted(r[1:-1] for r in self.stored())
+        synced_rollup = self.rollup()
+        self.load(df)
+        self.assertEqual(synced_rows, sorted(r[1:-1] for r in self.stored()))
+        self.assertEqual(synced_rollup, self.rollup())
+
+    def test_rows_added_changed_and_removed(self):
+        before = {r[1]: r[0] for r in self.stored()}
+        upload = frame(BASE[0], row('1002', 'AWS-002', '2024-01-06', geo='India'),
+                       row('1004', 'AWS-004', '2024-03-08'))
+        msg = self.load(upload, mode='sync')
+        self.assertEqual(msg, "1 records added, 1 changed, 1 removed.")
+        after = {r[1]: r for r in self.stored()}
+        # Unchanged and changed rows keep their ids; the removed one is gone
+        self.assertEqual(after['1001'][0], before['1001'])
+        self.assertEqual(after['1002'][0], before['1002'])
+        self.assertEqual(after['1002'][6], 'India')
+        self.assertNotIn('1003', after)
+        self.assertIn('1004', after)
+        self.assert_same_as_replace(upload)
+
+    def test_repeated_natural_keys(self):
+        first = row('1001', 'AWS-001', '2024-01-05', feedback='first')
+        second = row('1001', 'AWS-001', '2024-01-05', feedback='second')
+        self.load(frame(first, second))
+        self.assertEqual(self.load(frame(first, second, row('1001', 'AWS-001', '2024-01-05', feedback='third')),
+                                   mode='sync'), "1 records added, 0 changed, 0 removed.")
+        self.assertEqual(len(self.stored()), 3)
+        # Occurrences pair up in order: only the second one differs
+        upload = frame(first, row('1001', 'AWS-001', '2024-01-05', feedback='changed'))
+        self.assertEqual(self.load(upload, mode='sync'), "0 records added, 1 changed, 1 removed.")
+        self.assertEqual([r[-2] for r in self.stored()], ['first', 'changed'])
+        self.assert_same_as_replace(upload)
+
+    def test_unchanged_upload_leaves_rows_and_rollup_untouched(self):
+        rows, rollup = self.stored(), self.rollup()
+        self.assertEqual(self.load(frame(*BASE), mode='sync'), "0 records added, 0 changed, 0 removed.")
+        # Same ids and created_at: nothing was rewritten
+        self.assertEqual(self.stored(), rows)
+        self.assertEqual(self.rollup(), rollup)
+
+
+if __name__ == '__main__':
+    unittest.main()